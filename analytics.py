@@ -0,0 +1,273 @@
+import argparse
+import os
+import sys
+from array import array
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from time import perf_counter
+
+import numpy as np
+
+from replay import Replay
+from settings import *
+from tables import distances_to
+
+# Characters for the heatmap, from no visits to the most visited cell
+SHADES = ' .:-=+*#%@'
+
+
+def read_chunks(path, size=ANALYTICS_CHUNK_SIZE):
+    """
+    Read a replay archive in chunks of lines.
+
+    The lines are not decoded here, decoding is left to the worker processes. Only the
+    chunks handed out to the workers are in memory, never the whole archive.
+
+    Args:
+        path (str): The path of the archive.
+        size (int, optional): The number of replays per chunk.
+
+    Yields:
+        list: The JSON encoded replays of a chunk.
+    """
+    with open(path, encoding='utf-8') as file:
+        lines = (line for line in file if line.strip())
+        while True:
+            chunk = list(islice(lines, size))
+            if not chunk:
+                return
+            yield chunk
+
+
+class ArchiveStats:
+    """
+    A class collecting statistics over replayed games.
+
+    Statistics of separate chunks are collected independently and combined with `merge`,
+    so chunks can be analysed in separate processes.
+
+    Attributes:
+        games (int): The number of games.
+        ticks (int): The number of ticks over all games.
+        scores (Counter): The number of games per final score.
+        death_causes (Counter): The number of games per death cause, 'none' for games
+                                that were stopped before the snake died.
+        mismatches (int): The number of games whose replayed score differs from the stored one.
+        apples (int): The number of eaten apples with a reachable path.
+        shortest_moves (int): The sum of the shortest path lengths to those apples.
+        taken_moves (int): The sum of the moves the snake took to reach those apples.
+        efficiency_sum (float): The sum of shortest / taken over those apples.
+        heatmaps (dict): The number of head visits per cell, a flat NumPy array per level path.
+        shapes (dict): The (height, width) of every level in `heatmaps`.
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.ticks = 0
+        self.scores = Counter()
+        self.death_causes = Counter()
+        self.mismatches = 0
+        self.apples = 0
+        self.shortest_moves = 0
+        self.taken_moves = 0
+        self.efficiency_sum = 0.0
+        self.heatmaps = {}
+        self.shapes = {}
+
+    def add_game(self, replay):
+        """
+        Play a replay again and add its statistics.
+
+        Args:
+            replay (Replay): The game.
+        """
+        engine, controller = replay.start()
+        tables = engine.tables
+        heads = array('i', [engine.head])
+
+        # The path efficiency compares the moves to every apple with the shortest path
+        # from where the head was when the apple appeared
+        apple_tick = 0
+        shortest = -1 if engine.apple is None else distances_to(tables, engine.apple)[engine.head]
+
+        while engine.alive and (replay.ticks is None or engine.ticks < replay.ticks):
+            controller.act(engine)
+            if not engine.step():
+                break
+            heads.append(engine.head)
+            if engine.ate_apple:
+                if shortest > 0:
+                    taken = engine.ticks - apple_tick
+                    self.apples += 1
+                    self.shortest_moves += shortest
+                    self.taken_moves += taken
+                    self.efficiency_sum += shortest / taken
+                apple_tick = engine.ticks
+                shortest = -1 if engine.apple is None else distances_to(tables, engine.apple)[engine.head]
+
+        self.games += 1
+        self.ticks += engine.ticks
+        self.scores[engine.score] += 1
+        self.death_causes[engine.death_cause or 'none'] += 1
+        if replay.score is not None and replay.score != engine.score:
+            self.mismatches += 1
+
+        visits = np.bincount(np.frombuffer(heads, dtype=np.int32), minlength=tables.cells)
+        if replay.level in self.heatmaps:
+            self.heatmaps[replay.level] += visits
+        else:
+            self.heatmaps[replay.level] = visits.astype(np.int64)
+            self.shapes[replay.level] = (engine.level.height, engine.level.width)
+
+    def merge(self, other):
+        """
+        Add the statistics of another collection.
+
+        Args:
+            other (ArchiveStats): The statistics to add.
+        """
+        self.games += other.games
+        self.ticks += other.ticks
+        self.scores.update(other.scores)
+        self.death_causes.update(other.death_causes)
+        self.mismatches += other.mismatches
+        self.apples += other.apples
+        self.shortest_moves += other.shortest_moves
+        self.taken_moves += other.taken_moves
+        self.efficiency_sum += other.efficiency_sum
+        for level, visits in other.heatmaps.items():
+            if level in self.heatmaps:
+                self.heatmaps[level] += visits
+            else:
+                self.heatmaps[level] = visits
+                self.shapes[level] = other.shapes[level]
+
+    def heatmap(self, level):
+        """
+        Get the head visits of a level as a 2D array.
+
+        Args:
+            level (str): The level path, None for the plain board.
+
+        Returns:
+            numpy.ndarray: The number of visits, indexed by row and column.
+        """
+        return self.heatmaps[level].reshape(self.shapes[level])
+
+    def report(self):
+        """
+        Summarise the statistics as text.
+
+        Returns:
+            str: The report.
+        """
+        if not self.games:
+            return 'no games'
+
+        scores = np.repeat(np.fromiter(self.scores.keys(), dtype=np.int64),
+                           np.fromiter(self.scores.values(), dtype=np.int64))
+        p10, p50, p90 = np.percentile(scores, [10, 50, 90])
+        lines = [f'{self.games} games, {self.ticks} ticks',
+                 f'score: mean {scores.mean():.1f}, p10 {p10:.0f}, median {p50:.0f}, p90 {p90:.0f}, '
+                 f'max {scores.max()}']
+        if self.mismatches:
+            lines.append(f'{self.mismatches} games replayed to a different score than stored')
+
+        lines.append('death causes: ' + ', '.join(
+            f'{cause} {count} ({count / self.games:.1%})' for cause, count in self.death_causes.most_common()))
+
+        if self.apples:
+            lines.append(f'path efficiency: {self.shortest_moves / self.taken_moves:.1%} of moves on a shortest '
+                         f'path, {self.efficiency_sum / self.apples:.1%} per apple on average '
+                         f'({self.apples} apples)')
+
+        for level in self.heatmaps:
+            heatmap = self.heatmap(level)
+            lines.append(f'head visits, {level or "plain board"}:')
+            # Logarithmic, so a few cells the snake circles around do not hide the rest
+            shades = np.log1p(heatmap) * ((len(SHADES) - 1) / np.log1p(max(1, heatmap.max())))
+            for row in np.rint(shades).astype(int):
+                lines.append('|' + ''.join(SHADES[value] * 2 for value in row) + '|')
+        return '\n'.join(lines)
+
+
+def analyse_chunk(lines):
+    """
+    Analyse a chunk of a replay archive. This runs in the worker processes.
+
+    Args:
+        lines (list): The JSON encoded replays.
+
+    Returns:
+        ArchiveStats: The statistics of the chunk.
+    """
+    stats = ArchiveStats()
+    for line in lines:
+        stats.add_game(Replay.from_json(line))
+    return stats
+
+
+def analyse_archives(paths, workers=None, chunk_size=ANALYTICS_CHUNK_SIZE):
+    """
+    Analyse replay archives on a pool of worker processes.
+
+    Chunks are handed out as the workers finish earlier ones, with at most two chunks
+    per worker waiting, so memory use does not depend on the size of the archives.
+
+    Args:
+        paths (list): The paths of the archives.
+        workers (int, optional): The number of worker processes, by default one per core.
+                                 With 1, the chunks are analysed in this process.
+        chunk_size (int, optional): The number of replays per chunk.
+
+    Returns:
+        ArchiveStats: The statistics of all games.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = (chunk for path in paths for chunk in read_chunks(path, chunk_size))
+    stats = ArchiveStats()
+    if workers == 1:
+        for chunk in chunks:
+            stats.merge(analyse_chunk(chunk))
+        return stats
+
+    with ProcessPoolExecutor(workers) as executor:
+        pending = set()
+        for chunk in chunks:
+            pending.add(executor.submit(analyse_chunk, chunk))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stats.merge(future.result())
+        for future in pending:
+            stats.merge(future.result())
+    return stats
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Summarise the games of replay archives.')
+    parser.add_argument('archives', nargs='+', metavar='ARCHIVE', help='replay archives, as written with --record')
+    parser.add_argument('--workers', type=int, help='the number of worker processes, one per core by default')
+    parser.add_argument('--chunk-size', type=int, default=ANALYTICS_CHUNK_SIZE,
+                        help='the number of replays handed to a worker at once')
+    parser.add_argument('--heatmaps', metavar='FILE', help='save the head visit heatmaps into a .npz file')
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    start = perf_counter()
+    stats = analyse_archives(arguments.archives, arguments.workers, arguments.chunk_size)
+    elapsed = perf_counter() - start
+
+    print(stats.report())
+    if arguments.heatmaps:
+        np.savez_compressed(arguments.heatmaps,
+                            **{level or 'plain': stats.heatmap(level) for level in stats.heatmaps})
+    print(f'analysed in {elapsed:.2f} s ({stats.games / elapsed if elapsed else 0:.0f} games per second)',
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import argparse
+import sys
+import tracemalloc
+from time import perf_counter
+
+from engine import SnakeEngine
+from level import Level
+from settings import *
+from tables import DOWN, RIGHT
+from util import LimitedList
+
+
+def legacy_loop(length, width, height):
+    """
+    Set up the tick loop the way the frontends used to run it, with (row, column) tuples
+    and direction strings, on a board with wraparound.
+
+    The snake moves one row down and then to the right along the row, and again, so it
+    never meets itself as long as it is shorter than `max_length`.
+
+    Args:
+        length (int): The length of the snake.
+        width (int): The number of columns.
+        height (int): The number of rows.
+
+    Returns:
+        callable: Runs the given number of ticks.
+    """
+    body_positions = LimitedList(length, [(START_POS[1], START_POS[0])])
+    direction = 'right'
+    row = START_POS[1]
+    column = START_POS[0]
+    tick = 0
+
+    def run(ticks):
+        nonlocal direction, row, column, tick
+        for _ in range(ticks):
+            # The string chain of change_direction
+            new_direction = 'down' if tick % (width - 1) == 0 else 'right'
+            if direction == 'right' and new_direction != 'left':
+                direction = new_direction
+            elif direction == 'left' and new_direction != 'right':
+                direction = new_direction
+            elif direction == 'up' and new_direction != 'down':
+                direction = new_direction
+            elif direction == 'down' and new_direction != 'up':
+                direction = new_direction
+
+            current_direction = direction
+            row = (row + DIRECTIONS.get(current_direction)[1]) % height
+            column = (column + DIRECTIONS.get(current_direction)[0]) % width
+            in_range = (0 <= row < height) and (0 <= column < width)
+            hit_its_tail = (row, column) in list(body_positions)
+            if not in_range or hit_its_tail:
+                raise RuntimeError('the snake died during the benchmark')
+            body_positions.add((row, column))
+            tick += 1
+
+    # Let the snake grow to its length before measuring
+    run(length)
+    return run
+
+
+def engine_loop(length, width, height):
+    """
+    Set up the tick loop of the engine, with direction codes, cell indices and lookup
+    tables, on a board with wraparound, moving the snake like `legacy_loop`.
+
+    Args:
+        length (int): The length of the snake.
+        width (int): The number of columns.
+        height (int): The number of rows.
+
+    Returns:
+        callable: Runs the given number of ticks.
+    """
+    engine = SnakeEngine(seed=0, level=Level('benchmark', width, height, wrap=True))
+    # Let the snake grow to its length before measuring, along the same path
+    engine.grow_along_rows(length)
+    turn = engine.turn
+    step = engine.step
+
+    def run(ticks):
+        for _ in range(ticks):
+            turn(DOWN if engine.ticks % (width - 1) == 0 else RIGHT)
+            if not step():
+                raise RuntimeError('the snake died during the benchmark')
+
+    return run
+
+
+def max_length(width, height):
+    """
+    Get the longest snake the benchmark path has room for on a board.
+
+    Args:
+        width (int): The number of columns.
+        height (int): The number of rows.
+
+    Returns:
+        int: The maximum length.
+    """
+    # See SnakeEngine.grow_along_rows, which lays out the snake the engine loop starts from
+    return (width - 1) * (height - 1)
+
+
+def measure(loop, arguments):
+    """
+    Measure the time per tick and the memory allocated while a loop runs.
+
+    The loop runs twice: once for timing, and once tick by tick under tracemalloc, which
+    slows it down. There, the memory allocated during every tick is its peak above the
+    memory allocated before the tick, so temporary objects count even though they are
+    freed before the tick ends. The number of allocated memory blocks before and after
+    the run shows what the ticks leave behind. Setting up the game is not measured.
+
+    Returns:
+        tuple: The time per tick in microseconds, the bytes allocated per tick on average,
+               and the memory blocks left allocated per tick.
+    """
+    run = loop(arguments.length, arguments.width, arguments.height)
+    start = perf_counter()
+    run(arguments.ticks)
+    per_tick = (perf_counter() - start) / arguments.ticks * 1e6
+
+    run = loop(arguments.length, arguments.width, arguments.height)
+    allocated = 0
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    for _ in range(arguments.ticks):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        run(1)
+        allocated += tracemalloc.get_traced_memory()[1] - current
+    blocks = sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+    return per_tick, allocated / arguments.ticks, blocks / arguments.ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the tuple/string tick loop with the table driven one.')
+    parser.add_argument('--ticks', type=int, default=200_000)
+    parser.add_argument('--length', type=int, default=50, help='the length of the snake')
+    parser.add_argument('--width', type=int, default=100)
+    parser.add_argument('--height', type=int, default=FIELDS[1])
+    arguments = parser.parse_args()
+    if arguments.width < 3 or arguments.height < 2:
+        parser.error('the board must be at least 3x2')
+    if not 3 <= arguments.length <= max_length(arguments.width, arguments.height):
+        parser.error(f'the length must be between 3 and {max_length(arguments.width, arguments.height)} '
+                     f'on a {arguments.width}x{arguments.height} board')
+
+    print(f'{arguments.ticks} ticks, snake length {arguments.length}, '
+          f'board {arguments.width}x{arguments.height}')
+    for name, loop in (('tuples and strings', legacy_loop), ('tables and indices', engine_loop)):
+        per_tick, allocated, blocks = measure(loop, arguments)
+        print(f'{name:<20} {per_tick:8.3f} us per tick {allocated:10.1f} bytes allocated per tick '
+              f'{blocks:8.3f} blocks left per tick')
+
+
+if __name__ == '__main__':
+    main()
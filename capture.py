@@ -0,0 +1,288 @@
+import os
+import subprocess
+import threading
+from queue import Empty, Full, Queue
+
+from settings import *
+
+try:
+    from PIL import Image, ImageDraw
+except ImportError:  # Pillow is only needed for recording
+    Image = ImageDraw = None
+
+
+class FrameRenderer:
+    """
+    A class drawing frames of a game offscreen with Pillow, from engine state only.
+
+    Live widgets are never touched, so frames can be drawn on any thread. The level's
+    walls and portals are drawn once into a background image, every frame is a copy of
+    it with the snake and the apple drawn on top.
+    """
+
+    def __init__(self, level, cell_size=CAPTURE_CELL_SIZE):
+        """
+        Initialize the renderer.
+
+        Args:
+            level (Level): The level the game is played on.
+            cell_size (int, optional): The size of a cell in pixels.
+        """
+        self.width = level.width
+        self.cell_size = cell_size
+        self.size = (level.width * cell_size, level.height * cell_size)
+
+        self.background = Image.new('RGB', self.size, BACKGROUND_COLOR)
+        draw = ImageDraw.Draw(self.background)
+        for kind, color in (('wall', WALL_COLOR), ('portal', PORTAL_COLOR)):
+            for row, column in level.cells(kind):
+                draw.rectangle(self.rectangle(row * level.width + column), fill=color)
+
+    def rectangle(self, cell):
+        """
+        Get the pixel rectangle of a cell.
+
+        Args:
+            cell (int): The index of the cell.
+
+        Returns:
+            tuple: The (left, top, right, bottom) corners, inclusive.
+        """
+        row, column = divmod(cell, self.width)
+        size = self.cell_size
+        return column * size, row * size, (column + 1) * size - 1, (row + 1) * size - 1
+
+    def render(self, snapshot):
+        """
+        Draw a single frame.
+
+        Args:
+            snapshot (tuple): The body cells (tail to head) and the apple cell, as taken
+                              by `GameRecorder.capture`.
+
+        Returns:
+            Image: The frame.
+        """
+        body, apple = snapshot
+        frame = self.background.copy()
+        draw = ImageDraw.Draw(frame)
+        for cell in body[:-1]:
+            draw.rectangle(self.rectangle(cell), fill=SNAKE_BODY_COLOR)
+        draw.rectangle(self.rectangle(body[-1]), fill=SNAKE_HEAD_COLOR)
+        if apple is not None:
+            draw.ellipse(self.rectangle(apple), fill=APPLE_COLOR)
+        return frame
+
+
+class GifEncoder:
+    """
+    A class writing frames into an animated GIF.
+
+    GIF files can only be written in one go, so the frames are kept (as compact palette
+    images) until the recording is closed. To bound the memory this takes, a GIF holds
+    at most `max_frames` frames, later frames are left out.
+    """
+
+    def __init__(self, path, size, max_frames=CAPTURE_GIF_MAX_FRAMES):
+        self.path = path
+        self.max_frames = max_frames
+        self.frames = []
+        self.durations = []
+
+    @property
+    def full(self):
+        """
+        Whether the GIF holds as many frames as it may.
+        """
+        return len(self.frames) >= self.max_frames
+
+    def add(self, frame, duration):
+        """
+        Add a frame, unless the GIF is full.
+
+        Args:
+            frame (Image): The frame.
+            duration (int): How long the frame is shown, in milliseconds.
+        """
+        if self.full:
+            return
+        self.frames.append(frame.convert('P', palette=Image.Palette.ADAPTIVE, colors=16))
+        self.durations.append(duration)
+
+    def close(self):
+        """
+        Write the file.
+        """
+        if self.frames:
+            self.frames[0].save(self.path, save_all=True, append_images=self.frames[1:],
+                                duration=self.durations, loop=0)
+
+
+class VideoEncoder:
+    """
+    A class piping frames into ffmpeg, which encodes them into a video while recording.
+
+    Videos have a constant frame rate, so a frame is repeated for as many video frames
+    as its duration covers.
+    """
+    full = False  # Videos are written while recording, so they have no frame limit
+
+    def __init__(self, path, size):
+        self.frame_time = 1000 / CAPTURE_VIDEO_FPS
+        self.carry = 0.0
+        self.process = subprocess.Popen(
+            ['ffmpeg', '-loglevel', 'error', '-y', '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+             '-s', f'{size[0]}x{size[1]}', '-r', str(CAPTURE_VIDEO_FPS), '-i', '-',
+             '-pix_fmt', 'yuv420p', path],
+            stdin=subprocess.PIPE)
+
+    def add(self, frame, duration):
+        """
+        Add a frame.
+
+        Args:
+            frame (Image): The frame.
+            duration (int): How long the frame is shown, in milliseconds.
+        """
+        self.carry += duration
+        data = frame.tobytes()
+        while self.carry >= self.frame_time:
+            self.process.stdin.write(data)
+            self.carry -= self.frame_time
+
+    def close(self):
+        """
+        Finish the video.
+        """
+        self.process.stdin.close()
+        self.process.wait()
+
+
+class GameRecorder:
+    """
+    A class recording a game into a GIF or a video, without slowing the game down.
+
+    On the GUI thread, `capture` only copies the snake's cells out of the engine and hands
+    them to a background thread through a bounded queue. The background thread draws the
+    frames offscreen and encodes them. When the encoder cannot keep up and the queue is
+    full, frames are dropped instead of blocking the game; the duration of a dropped frame
+    is added to the next frame that gets through, so the recording plays back at the
+    speed the game was played at.
+
+    If the background thread fails (for example when ffmpeg is not installed), the error
+    is kept and `capture` raises it, so the frontend can stop recording.
+
+    Attributes:
+        path (str): The file the recording is written to.
+        dropped (int): The number of frames dropped because the queue was full.
+        error (Exception): The error the background thread stopped with, or None.
+    """
+    _STOP = object()
+
+    def __init__(self, path, level, queue_size=CAPTURE_QUEUE_SIZE):
+        """
+        Initialize the recorder and start its background thread.
+
+        Args:
+            path (str): The file to write, a '.gif' or a video format ffmpeg understands.
+            level (Level): The level the game is played on.
+            queue_size (int, optional): The number of frames that may wait for the encoder.
+
+        Raises:
+            RuntimeError: If Pillow is not installed.
+        """
+        if Image is None:
+            raise RuntimeError('Recording games needs Pillow (pip install pillow)')
+
+        self.path = path
+        self.dropped = 0
+        self.error = None
+        self._carried_duration = 0
+        self._dropped_snapshot = None
+        self._final = None
+        self._closed = threading.Event()
+        self._queue = Queue(maxsize=queue_size)
+        self._renderer = FrameRenderer(level)
+        self._thread = threading.Thread(target=self._encode, name='GameRecorder')
+        self._thread.start()
+
+    def capture(self, engine, duration):
+        """
+        Record the current state of a game as one frame.
+
+        This method never blocks. It is meant to be called on every tick.
+
+        Args:
+            engine (SnakeEngine): The game.
+            duration (int): How long the frame is shown, normally the tick interval in milliseconds.
+
+        Raises:
+            RuntimeError: If the background thread has stopped, because of `error`.
+        """
+        if not self._thread.is_alive():
+            raise RuntimeError(f'Recording to {self.path} failed: {self.error}')
+        snapshot = (tuple(engine.body_positions), engine.apple)
+        duration += self._carried_duration
+        try:
+            self._queue.put_nowait((snapshot, duration))
+        except Full:
+            self.dropped += 1
+            self._carried_duration = duration
+            self._dropped_snapshot = snapshot
+        else:
+            self._carried_duration = 0
+            self._dropped_snapshot = None
+
+    def close(self, wait=False):
+        """
+        Stop recording. The background thread finishes encoding the queued frames.
+
+        This method does not block unless asked to, even if the queue is full or the
+        background thread has stopped.
+
+        Args:
+            wait (bool, optional): Wait until the file is written.
+        """
+        # The last state is kept even if its frame was dropped, so the recording ends where the game did
+        self._final = None if self._dropped_snapshot is None else (self._dropped_snapshot, self._carried_duration)
+        self._closed.set()
+        try:
+            self._queue.put_nowait(self._STOP)
+        except Full:
+            pass  # The background thread notices the closed event once the queue runs empty
+        if wait:
+            self._thread.join()
+
+    def _encode(self):
+        """
+        Draw and encode the queued frames, until the recording is closed.
+        """
+        encoder = None
+        try:
+            if os.path.splitext(self.path)[1].lower() == '.gif':
+                encoder = GifEncoder(self.path, self._renderer.size)
+            else:
+                encoder = VideoEncoder(self.path, self._renderer.size)
+
+            while True:
+                try:
+                    item = self._queue.get(timeout=CAPTURE_POLL_INTERVAL)
+                except Empty:
+                    if self._closed.is_set():
+                        break
+                    continue
+                if item is self._STOP:
+                    break
+                snapshot, duration = item
+                if not encoder.full:
+                    encoder.add(self._renderer.render(snapshot), duration)
+
+            if self._final is not None and not encoder.full:
+                encoder.add(self._renderer.render(self._final[0]), self._final[1])
+        except Exception as error:
+            self.error = error
+        if encoder is not None:
+            try:
+                encoder.close()
+            except Exception as error:
+                self.error = self.error or error
@@ -0,0 +1,200 @@
+from random import Random
+
+from tables import OPPOSITE, WALL, distances_to
+
+
+def safe_moves(engine):
+    """
+    Get the directions that do not kill the snake on the next tick.
+
+    Args:
+        engine (SnakeEngine): The game.
+
+    Returns:
+        list: (direction code, target cell) pairs.
+    """
+    neighbours = engine.tables.neighbours
+    base = engine.head * 4
+    reverse = OPPOSITE[engine.moved_direction]
+    moves = []
+    for code in range(4):
+        target = neighbours[base + code]
+        if code != reverse and target != WALL and not engine.occupied[target]:
+            moves.append((code, target))
+    return moves
+
+
+def reachable_cells(engine, start, limit):
+    """
+    Count the free cells reachable from a cell, with a flood fill that stops at a limit.
+
+    Args:
+        engine (SnakeEngine): The game.
+        start (int): The cell to start from, counted as reachable.
+        limit (int): Stop counting once this many cells are found.
+
+    Returns:
+        int: The number of reachable cells, at most `limit`.
+    """
+    neighbours = engine.tables.neighbours
+    seen = bytearray(engine.occupied)
+    seen[start] = 1
+    stack = [start]
+    count = 1
+    while stack and count < limit:
+        cell = stack.pop()
+        for target in neighbours[cell * 4:cell * 4 + 4]:
+            if target != WALL and not seen[target]:
+                seen[target] = 1
+                stack.append(target)
+                count += 1
+    return min(count, limit)
+
+
+class Autopilot:
+    """
+    A controller that steers the snake towards the apple.
+
+    Of the directions that do not kill the snake on the next tick, the one bringing the
+    head closest to the apple is picked, preferring the current direction on ties. The
+    distance is the shortest path around the walls and through the portals and the
+    wraparound of the level. Like a player, it only acts through the engine's direction
+    change.
+    """
+    name = 'autopilot'
+
+    def act(self, engine):
+        """
+        Pick a direction for the next tick.
+
+        Args:
+            engine (SnakeEngine): The game to steer.
+        """
+        tables = engine.tables
+        neighbours = tables.neighbours
+        base = engine.head * 4
+        reverse = OPPOSITE[engine.moved_direction]
+        distances = None if engine.apple is None else distances_to(tables, engine.apple)
+
+        best_direction = None
+        best_distance = None
+        for code in range(4):
+            if code == reverse:
+                continue
+            target = neighbours[base + code]
+            if target == WALL or engine.occupied[target]:
+                continue
+
+            distance = 0 if distances is None else distances[target]
+            if distance == -1:
+                distance = tables.cells  # The apple cannot be reached from there
+            if best_distance is None or distance < best_distance or \
+                    (distance == best_distance and code == engine.direction):
+                best_direction = code
+                best_distance = distance
+
+        if best_direction is not None:
+            engine.turn(best_direction)
+
+
+class ReplayController:
+    """
+    A controller that repeats the recorded inputs of a replay.
+
+    The inputs are applied on the same ticks they were recorded on, so playing a replay
+    against an engine with the replay's seed reproduces the original game.
+    """
+    name = 'replay'
+
+    def __init__(self, inputs):
+        """
+        Initialize the controller.
+
+        Args:
+            inputs (list): The recorded (tick, direction) pairs, in order.
+        """
+        self.inputs = inputs
+        self.position = 0
+
+    def act(self, engine):
+        """
+        Apply the inputs recorded for the current tick.
+
+        Args:
+            engine (SnakeEngine): The game being replayed.
+        """
+        while self.position < len(self.inputs) and self.inputs[self.position][0] <= engine.ticks:
+            engine.change_direction(self.inputs[self.position][1])
+            self.position += 1
+
+
+class Wanderer:
+    """
+    A controller that turns at random, avoiding directions that kill the snake on the
+    next tick. It is the baseline other controllers are compared against.
+    """
+    name = 'wanderer'
+
+    def __init__(self, seed=None):
+        """
+        Initialize the controller.
+
+        Args:
+            seed (int, optional): The seed of the turns, by default the seed of the game.
+        """
+        self.seed = seed
+        self.rng = None
+
+    def act(self, engine):
+        """
+        Pick a direction for the next tick.
+
+        Args:
+            engine (SnakeEngine): The game to steer.
+        """
+        if self.rng is None:
+            self.rng = Random(engine.seed if self.seed is None else self.seed)
+        moves = [code for code, _ in safe_moves(engine)]
+        if moves and (engine.direction not in moves or self.rng.random() < 0.2):
+            engine.turn(self.rng.choice(moves))
+
+
+class Cautious:
+    """
+    A controller that steers towards the apple along the shortest path like the autopilot,
+    but looks ahead.
+
+    A direction is only taken if a flood fill from the cell it leads to finds room for
+    the whole snake, so the snake does not enclose itself. If no direction has enough
+    room, the one with the most room is taken.
+    """
+    name = 'cautious'
+
+    def act(self, engine):
+        """
+        Pick a direction for the next tick.
+
+        Args:
+            engine (SnakeEngine): The game to steer.
+        """
+        tables = engine.tables
+        distances = None if engine.apple is None else distances_to(tables, engine.apple)
+        length = engine.snake_body_length
+
+        best = None
+        for code, target in safe_moves(engine):
+            room = reachable_cells(engine, target, length)
+            distance = 0 if distances is None else distances[target]
+            if distance == -1:
+                distance = tables.cells  # The apple cannot be reached from there
+            # Enough room first, then the most room, then the apple, then keep going straight
+            key = (room < length, -room, distance, code != engine.direction)
+            if best is None or key < best[0]:
+                best = (key, code)
+
+        if best is not None:
+            engine.turn(best[1])
+
+
+# The controllers that can be picked by name
+CONTROLLERS = {controller.name: controller for controller in (Autopilot, Cautious, Wanderer)}
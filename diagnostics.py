@@ -0,0 +1,291 @@
+import argparse
+import fnmatch
+import gc
+import math
+import os
+import re
+import sys
+import tempfile
+import tracemalloc
+from collections import defaultdict
+
+from controllers import Autopilot
+from engine import SnakeEngine
+from level import Level, load_level
+from settings import *
+from tables import board_tables, distances_to
+from terminal_version import TerminalRenderer
+
+PHASES = ('act', 'step', 'draw')
+# Allocations of the measurement itself (snapshots, their filters) and of imports are not part of the game
+IGNORED = (tracemalloc.Filter(False, __file__),
+           tracemalloc.Filter(False, tracemalloc.__file__),
+           tracemalloc.Filter(False, fnmatch.__file__),
+           tracemalloc.Filter(False, os.path.join(os.path.dirname(re.__file__), '*')),
+           tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+           tracemalloc.Filter(False, '<unknown>'))
+
+
+def traced_memory():
+    """
+    Get the memory currently traced by tracemalloc, after a full garbage collection.
+
+    Returns:
+        int: The traced memory in bytes.
+    """
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def segment_bytes(length=DIAGNOSTICS_SEGMENT_LENGTH):
+    """
+    Measure how much memory a body segment of the snake takes.
+
+    A snake is grown one segment per tick, the way eating apples grows it, along rows of
+    a board with wraparound that is large enough for it (see `SnakeEngine.grow_along_rows`). The memory traced after the
+    board was set up is divided by the number of segments added.
+
+    Args:
+        length (int, optional): The length to grow the snake to.
+
+    Returns:
+        tuple: The bytes per segment and the peak bytes allocated while growing.
+    """
+    side = math.isqrt(length) + 3
+    engine = SnakeEngine(seed=0, level=Level('diagnostics', side, side, wrap=True))
+    start_length = engine.snake_body_length
+
+    started = tracemalloc.is_tracing()
+    if not started:
+        tracemalloc.start()
+    base = traced_memory()
+    tracemalloc.reset_peak()
+
+    engine.grow_along_rows(length)
+
+    growth = traced_memory() - base
+    peak = tracemalloc.get_traced_memory()[1] - base
+    if not started:
+        tracemalloc.stop()
+    return growth / (length - start_length), peak
+
+
+def restart_residency(games=DIAGNOSTICS_RESTARTS, level=None, max_ticks=FUZZ_MAX_TICKS):
+    """
+    Measure how much memory stays allocated when games are played and restarted.
+
+    The first game warms up the caches (levels and lookup tables), the memory growth
+    over the following games is what every restart leaves behind. The distances to
+    every cell are computed up front, otherwise the distance cache, which is bounded,
+    would count as growth while it fills with the apple cells of later games.
+
+    Args:
+        games (int, optional): The number of games.
+        level (Level, optional): The level to play on, the LEVEL setting by default.
+        max_ticks (int, optional): End every game after this many ticks.
+
+    Returns:
+        int: The memory growth from after the first game to after the last one, in bytes.
+    """
+    level = load_level() if level is None else level
+    tables = board_tables(level)
+    for cell in range(tables.cells):
+        distances_to(tables, cell)
+
+    started = tracemalloc.is_tracing()
+    if not started:
+        tracemalloc.start()
+    base = None
+    for seed in range(games):
+        engine = SnakeEngine(seed, level)
+        controller = Autopilot()
+        while engine.alive and engine.ticks < max_ticks:
+            controller.act(engine)
+            engine.step()
+        del engine, controller
+        if base is None:
+            base = traced_memory()
+    growth = traced_memory() - base
+    if not started:
+        tracemalloc.stop()
+    return growth
+
+
+def widget_restarts(games=DIAGNOSTICS_WIDGET_RESTARTS, max_ticks=FUZZ_MAX_TICKS):
+    """
+    Play autopilot games in the PySide6 board, offscreen, and count the labels every
+    restart leaves behind.
+
+    The games are restarted the way the play again button does it, inside the Qt event
+    loop, so widgets deleted with `deleteLater` are really gone before they are counted.
+    The save file and the leaderboard go to a temporary directory.
+
+    Args:
+        games (int, optional): The number of games.
+        max_ticks (int, optional): End every game after this many ticks.
+
+    Returns:
+        list: The number of labels not accounted for at the start of every game.
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtCore import QTimer
+    from PySide6.QtWidgets import QApplication
+    import pyside_version
+
+    app = QApplication.instance() or QApplication([])
+    counts = []
+    with tempfile.TemporaryDirectory() as directory:
+        board = pyside_version.Board(os.path.join(directory, SAVE_PATH), os.path.join(directory, LEADERBOARD_PATH))
+
+        def play():
+            board.timer.stop()  # The game is played here, as fast as possible
+            counts.append(board.unaccounted_labels())
+            controller = Autopilot()
+            while board.engine.alive and board.engine.ticks < max_ticks:
+                controller.act(board.engine)
+                board.movement()
+            if board.engine.alive:
+                board.game_over()
+            QTimer.singleShot(0, restart if len(counts) < games else app.quit)
+
+        def restart():
+            board.start_game()
+            QTimer.singleShot(0, play)
+
+        QTimer.singleShot(0, play)
+        app.exec()
+        board.leaderboard.close()
+        board.deleteLater()
+    return counts
+
+
+def phase_report(ticks, level=None, sample_every=DIAGNOSTICS_SAMPLE_EVERY, top=DIAGNOSTICS_TOP):
+    """
+    Play autopilot games drawn by the terminal renderer and attribute the memory
+    allocated in every tick phase: the controller picking a direction ('act'), the engine
+    moving the snake ('step') and the frontend drawing the changes ('draw').
+
+    The peak allocation of every phase is measured on every tick. On every
+    `sample_every`-th tick, tracemalloc snapshots are taken around each phase, and the
+    memory each phase left allocated is added up per source line.
+
+    Args:
+        ticks (int): The number of ticks to play. Games are restarted when they end.
+        level (Level, optional): The level to play on, the LEVEL setting by default.
+        sample_every (int, optional): Take snapshots on every this many ticks.
+        top (int, optional): The number of source lines listed per phase.
+
+    Returns:
+        str: The report.
+    """
+    level = load_level() if level is None else level
+    # The frames are written to the null device, so no buffer grows with them
+    renderer = TerminalRenderer(open(os.devnull, 'w'))
+    retained = {phase: defaultdict(int) for phase in PHASES}
+    peaks = dict.fromkeys(PHASES, 0)
+    peak_sums = dict.fromkeys(PHASES, 0)
+    restarts = 0
+
+    def run(phase, function, sample):
+        before = tracemalloc.take_snapshot().filter_traces(IGNORED) if sample else None
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        function()
+        peak = tracemalloc.get_traced_memory()[1] - current
+        peaks[phase] = max(peaks[phase], peak)
+        peak_sums[phase] += peak
+        if sample:
+            after = tracemalloc.take_snapshot().filter_traces(IGNORED)
+            for statistic in after.compare_to(before, 'lineno'):
+                if statistic.size_diff:
+                    retained[phase][str(statistic.traceback[0])] += statistic.size_diff
+
+    tracemalloc.start()
+    engine = SnakeEngine(0, level)
+    controller = Autopilot()
+    renderer.draw_board(engine)
+    for tick in range(ticks):
+        if not engine.alive:
+            engine = SnakeEngine(engine.seed + 1, level)
+            controller = Autopilot()
+            renderer.draw_board(engine)
+            restarts += 1
+
+        sample = tick % sample_every == 0
+        old_row, old_column = engine.row, engine.column
+        run('act', lambda: controller.act(engine), sample)
+        run('step', engine.step, sample)
+        run('draw', lambda: renderer.draw_tick(engine, old_row, old_column), sample)
+    tracemalloc.stop()
+    renderer.stream.close()
+
+    lines = [f'{ticks} ticks, {restarts} restarts, snapshots on every {sample_every}th tick']
+    for phase in PHASES:
+        lines.append(f'{phase}: peak {peaks[phase]} bytes, {peak_sums[phase] / ticks:.0f} bytes per tick on average, '
+                     f'{sum(retained[phase].values())} bytes retained in sampled ticks')
+        largest = sorted(retained[phase].items(), key=lambda item: -abs(item[1]))[:top]
+        for location, size in largest:
+            lines.append(f'    {size:+8d} B  {location}')
+    return '\n'.join(lines)
+
+
+def check_budgets():
+    """
+    Check the memory budgets: the bytes per body segment, the memory a restart leaves
+    behind, and that restarting the PySide6 board leaves no widgets behind.
+
+    Returns:
+        list: A description of every exceeded budget, empty if all are kept.
+    """
+    failures = []
+    per_segment, peak = segment_bytes()
+    print(f'{per_segment:.1f} bytes per body segment at length {DIAGNOSTICS_SEGMENT_LENGTH} '
+          f'(budget {DIAGNOSTICS_SEGMENT_BUDGET}), peak {peak} bytes while growing')
+    if per_segment > DIAGNOSTICS_SEGMENT_BUDGET:
+        failures.append(f'a body segment takes {per_segment:.1f} bytes')
+
+    growth = restart_residency()
+    print(f'{growth} bytes left behind by {DIAGNOSTICS_RESTARTS - 1} restarts '
+          f'(budget {DIAGNOSTICS_RESTART_BUDGET})')
+    if growth > DIAGNOSTICS_RESTART_BUDGET:
+        failures.append(f'restarts left {growth} bytes behind')
+
+    try:
+        counts = widget_restarts()
+    except ImportError as error:
+        print(f'widget check skipped, PySide6 frontend not available: {error}', file=sys.stderr)
+    else:
+        print(f'{max(counts)} labels left behind at most by {DIAGNOSTICS_WIDGET_RESTARTS - 1} restarts '
+              f'of the PySide6 board (budget 0)')
+        if max(counts):
+            failures.append(f'restarts left up to {max(counts)} labels behind: {counts}')
+    return failures
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Report where the memory of the game goes.')
+    parser.add_argument('--ticks', type=int, default=5000, help='the number of ticks of the phase report')
+    parser.add_argument('--level', default=LEVEL, help='the level file to play on')
+    parser.add_argument('--sample-every', type=int, default=DIAGNOSTICS_SAMPLE_EVERY,
+                        help='take tracemalloc snapshots on every this many ticks')
+    parser.add_argument('--check', action='store_true',
+                        help='only check the memory budgets, exit with status 1 if one is exceeded')
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    if arguments.check:
+        failures = check_budgets()
+        for failure in failures:
+            print(f'over budget: {failure}', file=sys.stderr)
+        sys.exit(1 if failures else 0)
+
+    per_segment, peak = segment_bytes()
+    print(f'{per_segment:.1f} bytes per body segment at length {DIAGNOSTICS_SEGMENT_LENGTH}, '
+          f'peak {peak} bytes while growing')
+    print(phase_report(arguments.ticks, load_level(arguments.level), arguments.sample_every))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+from random import Random, randrange
+
+from level import load_level
+from settings import *
+from tables import DIRECTION_CODES, DIRECTION_NAMES, DOWN, OPPOSITE, RIGHT, WALL, board_tables
+from util import LimitedList
+
+
+class SnakeEngine:
+    """
+    A class holding the rules and the state of a Snake game, without any widgets.
+
+    The frontends (CustomTkinter, PySide6 and the terminal) only draw what the engine
+    reports, so every frontend plays by exactly the same rules. All randomness comes from
+    a seeded `random.Random`, and every accepted direction change is recorded together
+    with the tick it happened on, so a game can be replayed from its seed and inputs.
+
+    Internally, directions are integer codes and cells are flat indices (see tables.py).
+    A tick is a lookup in the precomputed neighbour table and in the occupancy bitmap,
+    so it neither allocates coordinate tuples nor compares direction strings. It is not
+    entirely free of allocations: CPython boxes ints above 256, so the tick counter and
+    the new head cell are a small int object each, about 30 bytes per tick.
+
+    Attributes:
+        level (Level): The board the game is played on.
+        tables (BoardTables): The lookup tables of the level.
+        seed (int): The seed of the random number generator used for the apples.
+        rng (Random): The random number generator used for the apples.
+        direction (int): The direction code the snake will move in on the next tick.
+        moved_direction (int): The direction code the snake moved in on the last tick.
+        head (int): The cell of the snake's head.
+        snake_body_length (int): The length of the snake, including its head.
+        body_positions (LimitedList): The cells of the snake, from the tail to the head.
+        occupied (bytearray): 1 for every cell occupied by the snake, indexed by cell.
+        apple (int): The cell of the apple, or None if the board is full.
+        alive (bool): Whether the game is still running.
+        death_cause (str): 'wall' or 'tail' once the game is over, otherwise None.
+                           Leaving a board without wraparound counts as hitting a wall.
+        ticks (int): The number of ticks played so far.
+        inputs (list): The accepted direction changes as (tick, direction name) pairs.
+        ate_apple (bool): Whether the snake ate the apple on the last tick.
+        vacated (int): The cell the tail left on the last tick, or None if the snake grew.
+    """
+
+    def __init__(self, seed=None, level=None):
+        """
+        Initialize the engine and start a game.
+
+        Args:
+            seed (int, optional): The seed for the apple positions. A random seed is picked
+                                  if omitted.
+            level (Level, optional): The board to play on. Defaults to the LEVEL setting.
+        """
+        self.level = load_level() if level is None else level
+        self.tables = board_tables(self.level)
+        self.seed = randrange(2 ** 32) if seed is None else seed
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the game state to start a new game with the same seed.
+        """
+        self.rng = Random(self.seed)
+
+        # Set the initial direction of the snake
+        self.direction = RIGHT
+        self.moved_direction = RIGHT
+
+        self.snake_body_length = 3  # Initial length of the snake
+
+        # Initialize the starting position of the snake's head
+        self.head = self.tables.cell(START_POS[1], START_POS[0])
+
+        # The head is the last item, the tail the first
+        self.body_positions = LimitedList(3)
+        self.occupied = bytearray(self.tables.cells)
+        for cell in (self.head - 2, self.head - 1, self.head):
+            self.body_positions.add(cell)
+            self.occupied[cell] = 1
+
+        self.alive = True
+        self.death_cause = None
+        self.ticks = 0
+        self.inputs = []
+        self.ate_apple = False
+        self.vacated = None
+
+        self.randomize_apple_position()
+
+    @property
+    def score(self):
+        """
+        Get the score of the game, which is the length of the snake.
+
+        Returns:
+            int: The score.
+        """
+        return self.snake_body_length
+
+    @property
+    def row(self):
+        """
+        Get the row of the snake's head.
+
+        Returns:
+            int: The row.
+        """
+        return self.head // self.tables.width
+
+    @property
+    def column(self):
+        """
+        Get the column of the snake's head.
+
+        Returns:
+            int: The column.
+        """
+        return self.head % self.tables.width
+
+    @property
+    def apple_row(self):
+        """
+        Get the row of the apple.
+
+        Returns:
+            int: The row, or None if there is no apple.
+        """
+        return None if self.apple is None else self.apple // self.tables.width
+
+    @property
+    def apple_column(self):
+        """
+        Get the column of the apple.
+
+        Returns:
+            int: The column, or None if there is no apple.
+        """
+        return None if self.apple is None else self.apple % self.tables.width
+
+    def positions(self):
+        """
+        Get the positions of the snake, for drawing it.
+
+        Returns:
+            list: The (row, column) pairs of the snake, from the tail to the head.
+        """
+        width = self.tables.width
+        return [divmod(cell, width) for cell in self.body_positions]
+
+    def randomize_apple_position(self):
+        """
+        Randomizes the position of the apple on the grid.
+
+        Positions inside the snake, on walls or on portals are drawn again, so the apple
+        is always reachable and never placed under the snake. If the snake fills the whole
+        board there is no room left and the apple is removed (it becomes None).
+        """
+        level = self.level
+        if self.snake_body_length >= level.free_cells:
+            self.apple = None
+            return
+
+        # Subtract 1 from the level dimensions to account for 0-based indexing
+        max_row_index = level.height - 1
+        max_column_index = level.width - 1
+
+        while True:
+            cell = self.rng.randint(0, max_row_index) * level.width + self.rng.randint(0, max_column_index)
+            if not level.walls[cell] and cell not in level.portals and not self.occupied[cell]:
+                break
+        self.apple = cell
+
+    def change_direction(self, direction):
+        """
+        Change the direction of the snake's movement.
+
+        Args:
+            direction (str): One of 'up', 'down', 'left' or 'right'.
+
+        Returns:
+            bool: True if the direction change was accepted.
+        """
+        return self.turn(DIRECTION_CODES[direction])
+
+    def turn(self, code):
+        """
+        Change the direction of the snake's movement, by direction code.
+
+        The new direction is compared against the direction of the last movement rather
+        than the last requested one, so two quick key presses within one tick cannot turn
+        the snake back into itself.
+
+        Args:
+            code (int): The direction code.
+
+        Returns:
+            bool: True if the direction change was accepted.
+        """
+        if code == self.direction or code == OPPOSITE[self.moved_direction]:
+            return False
+        self.direction = code
+        self.inputs.append((self.ticks, DIRECTION_NAMES[code]))
+        return True
+
+    def grow(self, cells=1):
+        """
+        Let the snake grow by a number of cells, one on each of the coming ticks, the way
+        eating apples does.
+
+        Args:
+            cells (int, optional): The number of cells.
+        """
+        self.snake_body_length += cells
+        self.body_positions.max_size = self.snake_body_length
+
+    def grow_along_rows(self, length):
+        """
+        Grow the snake to a length without apples, for benchmarks and tests.
+
+        The snake grows one cell per tick, moving one row down and then along the row, again
+        and again. On a board with wraparound and without walls it never meets itself, as
+        long as the length is at most (width - 1) * (height - 1).
+
+        Args:
+            length (int): The length to grow the snake to.
+
+        Raises:
+            RuntimeError: If the snake died while growing.
+        """
+        self.apple = None
+        width = self.tables.width
+        while self.snake_body_length < length:
+            self.turn(DOWN if self.ticks % (width - 1) == 0 else RIGHT)
+            self.grow()
+            if not self.step():
+                raise RuntimeError(f'the snake died while growing, {self.death_cause}')
+
+    def step(self):
+        """
+        Move the snake by one cell.
+
+        The game ends when the head leaves the grid or hits a wall of the level ('wall'),
+        or moves into a cell currently occupied by the snake ('tail'); the cause is stored
+        in `death_cause` and the head stays on its last legal cell. Otherwise the snake
+        grows if it reached the apple, or its tail moves along.
+
+        Returns:
+            bool: True if the game can continue, False if the snake died on this tick.
+        """
+        if not self.alive:
+            return False
+
+        self.ticks += 1
+        self.ate_apple = False
+        self.vacated = None
+
+        direction = self.moved_direction = self.direction
+        target = self.tables.neighbours[self.head * 4 + direction]
+        if target == WALL:
+            self.death_cause = 'wall'
+            self.alive = False
+            return False
+        occupied = self.occupied
+        if occupied[target]:
+            self.death_cause = 'tail'
+            self.alive = False
+            return False
+
+        body = self.body_positions
+        if target == self.apple:
+            # Keep the tail on this tick by raising the maximum size of the body list
+            self.ate_apple = True
+            self.grow()
+        else:
+            tail = body.items[0]
+            occupied[tail] = 0
+            self.vacated = tail
+        body.add(target)
+        occupied[target] = 1
+        self.head = target
+
+        # The apple is moved once the head is part of the body, so it cannot land under the head
+        if self.ate_apple:
+            self.randomize_apple_position()
+        return True
@@ -0,0 +1,291 @@
+import argparse
+import os
+import random
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from time import perf_counter
+
+from controllers import Autopilot
+from engine import SnakeEngine
+from level import load_level
+from replay import Replay, save_replay
+from settings import *
+from tables import DIRECTION_NAMES, OPPOSITE
+
+
+def check_invariants(engine, previous_direction):
+    """
+    Check the rules that must hold after every tick.
+
+    Args:
+        engine (SnakeEngine): The game, right after a tick.
+        previous_direction (int): The direction code the snake moved in on the tick before.
+
+    Returns:
+        tuple: The name of the broken invariant and a description, or None if all hold.
+    """
+    body = engine.body_positions
+    if len(body) != engine.snake_body_length:
+        return 'length', f'{len(body)} body cells, but the length is {engine.snake_body_length}'
+    if len(set(body)) != len(body):
+        return 'duplicates', 'the body occupies a cell twice'
+    if body[-1] != engine.head:
+        return 'head', f'the head is on cell {engine.head}, but the body ends on cell {body[-1]}'
+    if engine.occupied.count(1) != len(body) or not all(engine.occupied[cell] for cell in body):
+        return 'occupancy', 'the occupancy bitmap does not match the body'
+    if engine.level.walls[engine.head]:
+        return 'wall', f'the head is inside a wall (cell {engine.head})'
+    if engine.apple is not None and engine.occupied[engine.apple]:
+        return 'apple', f'the apple is inside the body (cell {engine.apple})'
+    if engine.apple is None and engine.snake_body_length < engine.level.free_cells:
+        return 'apple', 'there is no apple, but the board is not full'
+    # Checked on the tick the snake dies as well, a reversal kills it by running into its neck
+    if engine.moved_direction == OPPOSITE[previous_direction]:
+        return 'reversal', (f'the snake reversed from {DIRECTION_NAMES[previous_direction]} '
+                            f'to {DIRECTION_NAMES[engine.moved_direction]}')
+    return None
+
+
+def random_presses(rng, engine):
+    """
+    Press a random arrow key on about every third tick.
+    """
+    return [rng.choice(DIRECTION_NAMES)] if rng.random() < 0.3 else []
+
+
+def mash_presses(rng, engine):
+    """
+    Press up to four random arrow keys within a single tick.
+    """
+    return [rng.choice(DIRECTION_NAMES) for _ in range(rng.randint(0, 4))]
+
+
+def reverse_presses(rng, engine):
+    """
+    Try to turn the snake back into itself: press the opposite of the last movement,
+    often right after a perpendicular key, which is the classic double press.
+    """
+    opposite = OPPOSITE[engine.moved_direction]
+    presses = [DIRECTION_NAMES[opposite]]
+    if rng.random() < 0.5:
+        presses.insert(0, DIRECTION_NAMES[(opposite + rng.choice((1, 3))) % 4])
+    return presses
+
+
+def autopilot_presses(rng, engine):
+    """
+    Let the autopilot steer, so the snake grows long, with a random key now and then.
+    The autopilot turns the engine itself, its turns are recorded from the engine's inputs.
+    """
+    AUTOPILOT.act(engine)
+    return [rng.choice(DIRECTION_NAMES)] if rng.random() < 0.02 else []
+
+
+AUTOPILOT = Autopilot()
+STRATEGIES = {
+    'random': random_presses,
+    'mash': mash_presses,
+    'reverse': reverse_presses,
+    'autopilot': autopilot_presses,
+}
+
+
+def run_case(seed, level, inputs=None, strategy=None, rng=None, max_ticks=FUZZ_MAX_TICKS):
+    """
+    Play a game, checking the invariants after every tick.
+
+    The key presses come either from a strategy, in which case every press is recorded,
+    or from a recorded list, when a failure is played again.
+
+    Args:
+        seed (int): The seed of the game.
+        level (str): The level path, None for the plain board.
+        inputs (list, optional): Recorded (tick, direction) presses to play.
+        strategy (callable, optional): Picks the presses of a tick, see STRATEGIES.
+        rng (Random, optional): The random number generator of the strategy.
+        max_ticks (int, optional): Stop after this many ticks.
+
+    Returns:
+        tuple: The number of ticks checked, the presses, and the broken invariant with
+               the tick it broke on, or None.
+    """
+    engine = SnakeEngine(seed, load_level(level))
+    presses = [] if inputs is None else inputs
+    position = 0
+    failure = check_invariants(engine, engine.moved_direction)
+
+    while failure is None and engine.alive and engine.ticks < max_ticks:
+        if strategy is None:
+            while position < len(presses) and presses[position][0] <= engine.ticks:
+                engine.change_direction(presses[position][1])
+                position += 1
+        else:
+            accepted = len(engine.inputs)
+            pressed = strategy(rng, engine)
+            presses.extend(engine.inputs[accepted:])
+            for direction in pressed:
+                engine.change_direction(direction)
+                presses.append((engine.ticks, direction))
+
+        previous_direction = engine.moved_direction
+        engine.step()
+        failure = check_invariants(engine, previous_direction)
+
+    if failure is not None:
+        failure = (*failure, engine.ticks)
+    return engine.ticks, presses, failure
+
+
+def shrink(seed, level, inputs, failure):
+    """
+    Reduce the presses of a failing game to a minimal list that still breaks the same
+    invariant, by removing ever smaller blocks of presses.
+
+    Args:
+        seed (int): The seed of the game.
+        level (str): The level path, None for the plain board.
+        inputs (list): The (tick, direction) presses of the failing game.
+        failure (tuple): The broken invariant, its description and the tick.
+
+    Returns:
+        tuple: The reduced presses and the failure they cause.
+    """
+    def fails(candidate):
+        _, _, result = run_case(seed, level, candidate, max_ticks=failure[2])
+        return result if result is not None and result[0] == failure[0] else None
+
+    # Presses after the failing tick cannot matter
+    inputs = [press for press in inputs if press[0] < failure[2]]
+    block = max(1, len(inputs) // 2)
+    while inputs:
+        removed = False
+        start = 0
+        while start < len(inputs):
+            candidate = inputs[:start] + inputs[start + block:]
+            result = fails(candidate)
+            if result is not None:
+                inputs, failure, removed = candidate, result, True
+            else:
+                start += block
+        if block == 1 and not removed:
+            break
+        if not removed:
+            block = max(1, block // 2)
+    return inputs, failure
+
+
+def fuzz_batch(levels, strategies, first_seed, count, max_ticks):
+    """
+    Fuzz a batch of games. This runs in the worker processes.
+
+    Game i uses the seed `first_seed + i` for the apples and the presses, and picks its
+    level and strategy from it, so every game can be reproduced from its seed.
+
+    Args:
+        levels (list): The level paths to pick from, None for the plain board.
+        strategies (list): The names of the strategies to pick from.
+        first_seed (int): The seed of the first game.
+        count (int): The number of games.
+        max_ticks (int): The maximum length of a game.
+
+    Returns:
+        tuple: The number of ticks checked and a list of shrunk failures, as
+               (replay, invariant, description) tuples.
+    """
+    ticks = 0
+    failures = []
+    for seed in range(first_seed, first_seed + count):
+        rng = random.Random(seed)
+        level = levels[seed % len(levels)]
+        strategy = strategies[seed // len(levels) % len(strategies)]
+        played, presses, failure = run_case(seed, level, strategy=STRATEGIES[strategy], rng=rng,
+                                            max_ticks=max_ticks)
+        ticks += played
+        if failure is not None:
+            presses, failure = shrink(seed, level, presses, failure)
+            replay = Replay(seed, presses, f'fuzz:{strategy}', ticks=failure[2], level=level)
+            failures.append((replay, failure[0], failure[1]))
+    return ticks, failures
+
+
+def default_levels():
+    """
+    Get the plain board and every level in LEVELS_DIR.
+
+    Returns:
+        list: The level paths, None for the plain board.
+    """
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), LEVELS_DIR)
+    return [None] + sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.txt'))
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Check the movement rules against random and adversarial input.')
+    parser.add_argument('--duration', type=float, default=60, help='seconds to run, 0 runs until interrupted')
+    parser.add_argument('--games', type=int, help='stop after this many games instead')
+    parser.add_argument('--workers', type=int, help='the number of worker processes, one per core by default')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the first game')
+    parser.add_argument('--max-ticks', type=int, default=FUZZ_MAX_TICKS, help='end every game after this many ticks')
+    parser.add_argument('--level', action='append', dest='levels', help='a level to fuzz, all levels by default')
+    parser.add_argument('--strategy', action='append', dest='strategies', choices=sorted(STRATEGIES),
+                        help='an input strategy, all strategies by default')
+    parser.add_argument('--failures', default=FUZZ_FAILURES_PATH,
+                        help='the replay archive the shrunk failures are appended to')
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    levels = [load_level(path).path for path in arguments.levels] if arguments.levels else default_levels()
+    strategies = arguments.strategies or sorted(STRATEGIES)
+    workers = arguments.workers or os.cpu_count() or 1
+
+    seed = arguments.seed
+    games = ticks = failures = 0
+    start = last_report = perf_counter()
+
+    def more():
+        if arguments.games is not None:
+            return seed < arguments.seed + arguments.games
+        return not arguments.duration or perf_counter() - start < arguments.duration
+
+    with ProcessPoolExecutor(workers) as executor:
+        pending = {}  # The number of games of every submitted batch
+        try:
+            while pending or more():
+                # Keep two batches per worker queued, so no worker waits for the next one
+                while more() and len(pending) < workers * 2:
+                    count = FUZZ_BATCH_SIZE
+                    if arguments.games is not None:
+                        count = min(count, arguments.seed + arguments.games - seed)
+                    pending[executor.submit(fuzz_batch, levels, strategies, seed, count, arguments.max_ticks)] = count
+                    seed += count
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch_ticks, batch_failures = future.result()
+                    games += pending.pop(future)
+                    ticks += batch_ticks
+                    for replay, invariant, description in batch_failures:
+                        failures += 1
+                        save_replay(arguments.failures, replay)
+                        print(f'seed {replay.seed}, {replay.controller}, tick {replay.ticks}: {invariant}: '
+                              f'{description} ({len(replay.inputs)} presses)', file=sys.stderr)
+
+                if perf_counter() - last_report >= FUZZ_REPORT_INTERVAL:
+                    last_report = perf_counter()
+                    elapsed = last_report - start
+                    print(f'{games} games, {ticks} ticks, {failures} failures, '
+                          f'{ticks / elapsed:.0f} ticks checked per second', file=sys.stderr)
+        except KeyboardInterrupt:
+            for future in pending:
+                future.cancel()
+
+    elapsed = perf_counter() - start
+    print(f'{games} games, {ticks} ticks checked in {elapsed:.2f} s '
+          f'({ticks / elapsed if elapsed else 0:.0f} ticks per second), {failures} failures'
+          + (f', written to {arguments.failures}' if failures else ''))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
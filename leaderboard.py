@@ -0,0 +1,246 @@
+import atexit
+import getpass
+import sqlite3
+import sys
+import threading
+import time
+from queue import Empty, Queue
+
+from settings import *
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    controller TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    ticks INTEGER NOT NULL,
+    seed INTEGER NOT NULL,
+    level TEXT,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_by_score ON games (score DESC, duration);
+CREATE INDEX IF NOT EXISTS games_by_player ON games (player, score DESC, duration);
+"""
+
+
+def player_name():
+    """
+    Get the name finished games are stored under.
+
+    Returns:
+        str: The PLAYER_NAME setting, or the login name if it is not set.
+    """
+    if PLAYER_NAME:
+        return PLAYER_NAME
+    try:
+        return getpass.getuser()
+    except Exception:
+        return 'player'
+
+
+def connect(path):
+    """
+    Open the leaderboard database in WAL mode, so reads never wait for the writer.
+
+    Args:
+        path (str): The path of the database file.
+
+    Returns:
+        sqlite3.Connection: The connection.
+    """
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+
+class Leaderboard:
+    """
+    A class storing every finished game in a SQLite database.
+
+    `record` never touches the database: it puts the game on a queue, and a background
+    thread writes queued games in batches, one transaction per batch. Queries use their
+    own connection and the score indexes, so they stay fast with millions of rows, and
+    in WAL mode they are not blocked by a running write.
+
+    A batch that cannot be written (for example because another process holds the write
+    lock for too long) is tried again a few times. If it still fails, its games are
+    reported on stderr and counted in `lost`, and the writer goes on with the next batch.
+
+    Attributes:
+        path (str): The path of the database file.
+        lost (int): The number of games that could not be written.
+    """
+    _STOP = object()
+
+    def __init__(self, path=LEADERBOARD_PATH):
+        """
+        Open the database, creating it if needed, and start the writer thread.
+
+        Args:
+            path (str, optional): The path of the database file.
+        """
+        self.path = path
+        self.lost = 0
+        self._reader = connect(path)
+        self._reader.executescript(SCHEMA)
+        self._queue = Queue()
+        self._thread = threading.Thread(target=self._write, name='LeaderboardWriter', daemon=True)
+        self._thread.start()
+        # Queued games are still written when the program exits
+        atexit.register(self.close)
+
+    def record(self, engine, duration, controller='keyboard', player=None):
+        """
+        Store a finished game. This method never blocks.
+
+        Args:
+            engine (SnakeEngine): The finished game.
+            duration (float): How long the game lasted, in seconds.
+            controller (str, optional): The name of whoever played the game.
+            player (str, optional): The name of the player, see `player_name`.
+        """
+        self._queue.put((player or player_name(), controller, engine.score, duration, engine.ticks,
+                         engine.seed, engine.level.path, time.time()))
+
+    def top(self, count=LEADERBOARD_SIZE):
+        """
+        Get the best games.
+
+        Args:
+            count (int, optional): The number of games.
+
+        Returns:
+            list: (player, score, duration) rows, best first.
+        """
+        return self._reader.execute(
+            'SELECT player, score, duration FROM games ORDER BY score DESC, duration LIMIT ?',
+            (count,)).fetchall()
+
+    def player_top(self, player=None, count=LEADERBOARD_SIZE):
+        """
+        Get the best games of one player.
+
+        Args:
+            player (str, optional): The name of the player, see `player_name`.
+            count (int, optional): The number of games.
+
+        Returns:
+            list: (score, duration, controller) rows, best first.
+        """
+        return self._reader.execute(
+            'SELECT score, duration, controller FROM games WHERE player = ? '
+            'ORDER BY score DESC, duration LIMIT ?',
+            (player or player_name(), count)).fetchall()
+
+    def summary(self, current=None, count=LEADERBOARD_SIZE):
+        """
+        Get the best games as text, for a game over page.
+
+        The game that just ended may not be written yet, so it can be passed in and is
+        ranked among the stored games, marked with an arrow.
+
+        Args:
+            current (tuple, optional): The (player, score, duration) of the game that just ended.
+            count (int, optional): The number of games.
+
+        Returns:
+            str: One line per game.
+        """
+        rows = self.top(count)
+        if current is not None:
+            rows.append(current)
+            rows.sort(key=lambda row: (-row[1], row[2]))
+        lines = [f'{"> " if row is current else ""}{rank}. {row[0]}  {row[1]}  ({row[2]:.0f} s)'
+                 for rank, row in enumerate(rows[:count], start=1)]
+        return '\n'.join(lines)
+
+    def finish(self, engine, duration, controller='keyboard'):
+        """
+        Store a finished game and get the text for its game over page.
+
+        The stored games are read before the new game is queued, so the new game is
+        listed exactly once.
+
+        Args:
+            engine (SnakeEngine): The finished game.
+            duration (float): How long the game lasted, in seconds.
+            controller (str, optional): The name of whoever played the game.
+
+        Returns:
+            str: The best games, followed by the player's own best score.
+        """
+        player = player_name()
+        text = self.summary(current=(player, engine.score, duration))
+        best = self.player_top(player, count=1)
+        best_score = max(best[0][0], engine.score) if best else engine.score
+        self.record(engine, duration, controller, player)
+        return f'{text}\n\nyour best = {best_score}'
+
+    def close(self):
+        """
+        Write the queued games and stop the writer thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+    def _write(self):
+        """
+        Write queued games in batches until the leaderboard is closed.
+
+        A batch collects what is queued, waiting at most LEADERBOARD_FLUSH_INTERVAL seconds
+        for more games after the first one, up to LEADERBOARD_BATCH_SIZE games.
+        """
+        connection = None
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + LEADERBOARD_FLUSH_INTERVAL
+            while len(batch) < LEADERBOARD_BATCH_SIZE:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            connection = self._insert(connection, batch)
+        if connection is not None:
+            connection.close()
+
+    def _insert(self, connection, batch):
+        """
+        Write a batch of games in one transaction, trying again if the database fails.
+
+        Args:
+            connection (sqlite3.Connection): The connection of the writer thread, None if it
+                                             is not open yet.
+            batch (list): The rows of the games.
+
+        Returns:
+            sqlite3.Connection: The connection to use for the next batch, None if it could
+                                not be opened.
+        """
+        for attempt in range(1, LEADERBOARD_WRITE_ATTEMPTS + 1):
+            try:
+                if connection is None:
+                    connection = connect(self.path)
+                with connection:
+                    connection.executemany(
+                        'INSERT INTO games (player, controller, score, duration, ticks, seed, level, finished_at) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+                return connection
+            except sqlite3.Error as error:
+                if attempt == LEADERBOARD_WRITE_ATTEMPTS:
+                    self.lost += len(batch)
+                    print(f'leaderboard: {len(batch)} games could not be written to {self.path}: {error}',
+                          file=sys.stderr)
+                    return connection
+                time.sleep(LEADERBOARD_RETRY_DELAY * attempt)
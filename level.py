@@ -0,0 +1,208 @@
+import mmap
+import os
+import re
+from functools import lru_cache
+
+from settings import *
+
+# Translation table turning a line of a level file into one byte per cell, 1 for walls
+WALL_TABLE = bytes(1 if chr(byte) == WALL_CHAR else 0 for byte in range(256))
+PORTAL_PATTERN = re.compile(rb'[A-Z]')
+
+
+class Level:
+    """
+    A class representing the board a game is played on.
+
+    The walls are stored as a compact bitmap with one byte per cell, indexed by
+    `row * width + column`, so checking a cell for a wall is a single lookup no matter
+    how large the level is. Portals come in pairs: a snake entering one portal cell
+    continues from the other one. When `wrap` is set, leaving the board on one edge
+    brings the snake back on the opposite edge.
+
+    Attributes:
+        name (str): The name of the level, taken from its file name.
+        path (str): The path of the level file, or None for the plain board.
+        width (int): The number of columns.
+        height (int): The number of rows.
+        walls (bytearray): The wall bitmap, 1 for walls and 0 for free cells.
+        portals (dict): Maps the cell index of a portal to the (row, column) of its partner.
+        wrap (bool): Whether the edges of the board wrap around.
+        free_cells (int): The number of cells that are neither walls nor portals.
+    """
+
+    def __init__(self, name, width, height, walls=None, portals=None, wrap=False, path=None):
+        """
+        Initialize the level.
+
+        Args:
+            name (str): The name of the level.
+            width (int): The number of columns.
+            height (int): The number of rows.
+            walls (bytearray, optional): The wall bitmap, no walls if omitted.
+            portals (dict, optional): The portals, no portals if omitted.
+            wrap (bool, optional): Whether the edges of the board wrap around.
+            path (str, optional): The path of the level file.
+        """
+        self.name = name
+        self.path = path
+        self.width = width
+        self.height = height
+        self.walls = bytearray(width * height) if walls is None else walls
+        self.portals = {} if portals is None else portals
+        self.wrap = wrap
+        self.free_cells = width * height - sum(self.walls) - len(self.portals)
+
+    def is_wall(self, row, column):
+        """
+        Check whether a cell on the board is a wall.
+
+        Args:
+            row (int): The row of the cell.
+            column (int): The column of the cell.
+
+        Returns:
+            bool: True if the cell is a wall.
+        """
+        return self.walls[row * self.width + column] == 1
+
+    def cells(self, kind):
+        """
+        Get the cells of one kind, for drawing the level.
+
+        Args:
+            kind (str): 'wall' or 'portal'.
+
+        Returns:
+            list: The (row, column) pairs of the cells.
+        """
+        if kind == 'portal':
+            indices = self.portals
+        else:
+            indices = [index for index, wall in enumerate(self.walls) if wall]
+        return [divmod(index, self.width) for index in indices]
+
+
+def parse_level(name, data, path=None):
+    """
+    Build a level from the contents of a level file.
+
+    A level file starts with optional `key = value` option lines (only `wrap = yes` is
+    understood), followed by the rows of the board. In a row, '#' is a wall, '.' is a free
+    cell and each capital letter marks one end of a portal; every letter must appear
+    exactly twice. Lines starting with ';' are comments.
+
+    Args:
+        name (str): The name of the level.
+        data: The contents of the file, as bytes or an mmap.
+        path (str, optional): The path of the file.
+
+    Returns:
+        Level: The parsed level.
+
+    Raises:
+        ValueError: If the file is malformed.
+    """
+    walls = bytearray()
+    portal_ends = {}
+    wrap = False
+    width = None
+    height = 0
+
+    position = 0
+    end = len(data)
+    while position < end:
+        line_end = data.find(b'\n', position)
+        if line_end == -1:
+            line_end = end
+        line = data[position:line_end].rstrip(b'\r\t ')
+        position = line_end + 1
+
+        if not line or line.startswith(b';'):
+            continue
+        if b'=' in line:
+            if width is not None:
+                raise ValueError(f'{name}: options must come before the board')
+            key, value = (part.strip().decode() for part in line.split(b'=', 1))
+            if key != 'wrap':
+                raise ValueError(f'{name}: unknown option {key!r}')
+            wrap = value.lower() in ('yes', 'true', '1')
+            continue
+
+        if width is None:
+            width = len(line)
+        elif len(line) != width:
+            raise ValueError(f'{name}: row {height + 1} is {len(line)} cells wide, expected {width}')
+
+        for match in PORTAL_PATTERN.finditer(line):
+            portal_ends.setdefault(match.group(), []).append(height * width + match.start())
+        walls += line.translate(WALL_TABLE)
+        height += 1
+
+    if width is None:
+        raise ValueError(f'{name}: the level has no board')
+
+    portals = {}
+    for letter, indices in portal_ends.items():
+        if len(indices) != 2:
+            raise ValueError(f'{name}: portal {letter.decode()} must appear exactly twice')
+        first, second = indices
+        portals[first] = divmod(second, width)
+        portals[second] = divmod(first, width)
+
+    level = Level(name, width, height, walls, portals, wrap, path)
+
+    # The snake starts on three cells ending at START_POS, these must be free
+    row = START_POS[1]
+    for column in range(START_POS[0] - 2, START_POS[0] + 1):
+        if not (0 <= row < height and 0 <= column < width) or \
+                level.is_wall(row, column) or row * width + column in portals:
+            raise ValueError(f'{name}: the starting position of the snake is not free')
+    return level
+
+
+@lru_cache(maxsize=LEVEL_CACHE_SIZE)
+def _load_level(path, modified, size):
+    """
+    Parse a level file, cached on its path, modification time and size.
+
+    The file is memory mapped, so a large level is parsed without first reading it
+    into a separate buffer.
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    if size == 0:
+        return parse_level(name, b'', path)
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return parse_level(name, data, path)
+
+
+def load_level(path=LEVEL):
+    """
+    Load a level, or the plain rectangular board if no path is given.
+
+    Levels are cached, so starting a new game on the same level does not parse the file
+    again. A file that changed on disk is parsed again.
+
+    Args:
+        path (str, optional): The path of the level file. Relative paths are looked up
+                              in LEVELS_DIR first. Defaults to the LEVEL setting.
+
+    Returns:
+        Level: The loaded level.
+    """
+    if path is None:
+        return _rectangle(FIELDS[0], FIELDS[1])
+
+    if not os.path.isabs(path) and not os.path.exists(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), LEVELS_DIR, path)
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return _load_level(path, stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=None)
+def _rectangle(width, height):
+    """
+    Get the plain rectangular board without walls, portals or wraparound.
+    """
+    return Level('rectangle', width, height)
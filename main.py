@@ -1,7 +1,13 @@
+import sys
+import time
+
 import customtkinter as ctk
 from settings import *
-from random import randint
-from util import LimitedList
+from engine import SnakeEngine
+from leaderboard import Leaderboard
+from level import load_level
+from snapshot import discard_game, load_game, save_game
+from speed import SpeedScheduler
 
 ctk.set_appearance_mode('dark')
 
@@ -23,26 +29,36 @@ class Snake(ctk.CTk):
         # window setup
         self.title('Snake')
         self.geometry(f'{WINDOW_SIZE[0]}x{WINDOW_SIZE[1]}')
+        # Load the level once, it is reused by every game
+        self.level = load_level()
+        # Every finished game is stored, in the background
+        self.leaderboard = Leaderboard()
         # Configure the grid layout for the window
         self.grid_window()
         # Set up keyboard controls
         self.bind_keyboard()
-        # Initialize the starting state of the game
-        self.start_game()
+        # A running game is saved when the window is closed
+        self.protocol('WM_DELETE_WINDOW', self.close)
+        # Continue the saved game if there is one, otherwise start a new game
+        try:
+            saved = load_game(SAVE_PATH, self.level)
+        except (OSError, ValueError):  # A save from another level, or a broken one, cannot be continued
+            saved = None
+        self.start_game(saved)
 
     def grid_window(self):
         """
         Configures the grid layout for the window.
 
         This method sets up the grid layout for the window by configuring the rows and columns
-        based on the number of rows and columns specified in the `FIELDS` constant. Each row and
+        based on the number of rows and columns of the level (the `LEVEL` setting). Each row and
         column is configured to have an equal weight and uniform size, ensuring that the grid
         cells are evenly distributed across the window.
 
         :return: None
         """
-        number_of_rows = FIELDS[1]
-        number_of_columns = FIELDS[0]
+        number_of_rows = self.level.height
+        number_of_columns = self.level.width
         # creating the rows
         for index in range(number_of_rows):
             self.rowconfigure(index, weight=1, uniform='a')
@@ -51,54 +67,77 @@ class Snake(ctk.CTk):
         for index in range(number_of_columns):
             self.columnconfigure(index, weight=1, uniform='a')
 
-    def start_game(self):
+    def start_game(self, saved=None):
         """
         Initialize or reset the game state to start a new game.
 
         This method performs the following actions:
         1. Clears all existing widgets from the window.
-        2. Sets the initial direction of the snake.
+        2. Creates a new game engine, which holds the rules and the state of the game.
         3. Creates and positions the apple.
-        4. Sets initial game parameters (speed, snake length).
+        4. Sets initial game parameters (speed).
         5. Creates the snake's head and body parts.
         6. Positions the snake on the grid.
         7. Starts the snake's movement.
 
         This method can be called to start a new game or to reset the game after it ends.
+
+        Args:
+            saved (tuple, optional): A saved game, as returned by `load_game`. It is continued
+                                     instead of starting a new game, paused.
         """
         # Clear all existing widgets from the window
         for widget in self.winfo_children():
             widget.destroy()
 
-        # Set the initial direction of the snake
-        self.direction = 'right'
+        # The engine holds the rules, the snake's positions and the apple
+        if saved is None:
+            self.engine = SnakeEngine(level=self.level)
+            elapsed = 0.0
+        else:
+            self.engine, elapsed = saved
+        self.started = time.monotonic() - elapsed
 
-        # Create the apple and place it randomly on the grid
+        # Draw the walls and portals of the level
+        self.draw_level()
+
+        # Create the apple and place it on the grid
         self.apple = ctk.CTkFrame(self, fg_color=APPLE_COLOR)
         self.randomize_apple_position()
 
         # Set initial game parameters
-        self.refresh_speed = 250  # Movement speed of the snake
-        self.snake_body_length = 3  # Initial length of the snake
-
-        # Initialize the starting position of the snake's head
-        self.row = START_POS[1]
-        self.column = START_POS[0]
+        # Decides the movement speed, the snake grows by one for every apple
+        self.speed = SpeedScheduler(on_degrade=self.disable_effects, apples=self.engine.snake_body_length - 3)
+        self.refresh_speed = self.speed.interval  # Movement speed of the snake
 
-        # Create a limited list to store the snake's body parts
-        self.body_positions = LimitedList(3)  # Stores positions of body parts
         self.body_objects = []  # Stores the actual body part widgets
 
         # Create the snake's head
         self.snake_head = ctk.CTkFrame(self, fg_color=SNAKE_HEAD_COLOR, corner_radius=0)
 
         # Create and add initial body parts to the snake's body list
-        self.create_body_parts(number=2)
+        self.create_body_parts(number=self.engine.snake_body_length - 1)
 
         self.initialize_snake_position()
 
-        # Start the snake's movement
-        self.movement()
+        # Start the snake's movement, a continued game waits for the player
+        self.paused = False
+        self.next_movement = None  # The scheduled call of `movement`
+        self.title('Snake')
+        if saved is None:
+            self.movement()
+        else:
+            self.toggle_pause()
+
+    def draw_level(self):
+        """
+        Places the walls and portals of the level on the grid.
+
+        :return: None
+        """
+        for kind, color in (('wall', WALL_COLOR), ('portal', PORTAL_COLOR)):
+            for row, column in self.level.cells(kind):
+                ctk.CTkFrame(self, fg_color=color, corner_radius=0).grid(row=row, column=column, sticky='news')
 
     def bind_keyboard(self):
         """
@@ -113,66 +152,59 @@ class Snake(ctk.CTk):
         - Left arrow key changes the direction to 'left'.
         - Right arrow key changes the direction to 'right'.
 
+        The P key pauses and continues the game, F10 prints the widget counts (see `widget_report`).
+
         :return: None
         """
         self.bind('<Up>', lambda e: self.change_direction(e, 'up'))
         self.bind('<Down>', lambda e: self.change_direction(e, 'down'))
         self.bind('<Left>', lambda e: self.change_direction(e, 'left'))
         self.bind('<Right>', lambda e: self.change_direction(e, 'right'))
+        self.bind('<p>', self.toggle_pause)
+        self.bind('<F10>', lambda e: print(self.widget_report(), file=sys.stderr))
 
     def randomize_apple_position(self):
         """
-        Randomizes the position of the apple on the grid.
+        Places the apple on the grid.
 
-        This method generates a random position for the apple within the bounds of the grid
-        defined by the `FIELDS` constant. The apple's row and column indices are set to random
-        values within the allowable range, and the apple is placed at the new position on the grid.
+        The engine picks the random position of the apple, this method moves the apple
+        widget there. If the snake fills the whole board, the apple is hidden.
 
         :return: None
         """
+        if self.engine.apple_row is None:
+            self.apple.grid_forget()
+            return
 
-        # Calculate the maximum possible row and column indices
-        # Subtract 1 from FIELDS dimensions to account for 0-based indexing
-        max_row_index = FIELDS[1] - 1
-        max_column_index = FIELDS[0] - 1
-
-        # Generate random row and column indices for the apple
-        self.apple_row = randint(0, max_row_index)
-        self.apple_column = randint(0, max_column_index)
-
-        # Place the apple at the randomly generated position on the grid
+        # Place the apple at the position picked by the engine
         # The 'grid' method is used to position the apple widget
-        self.apple.grid(row=self.apple_row, column=self.apple_column)
+        self.apple.grid(row=self.engine.apple_row, column=self.engine.apple_column)
 
     def initialize_snake_position(self):
         """
         Initialize the starting position of the snake on the grid.
 
-        This method sets up the initial body positions of the snake,
-        places the body parts on the grid, and positions the snake's head.
+        This method places the body parts on the grid at the body positions of the
+        engine, and positions the snake's head. The first body part is the one just
+        behind the head, as `update_body_positions` expects.
         """
 
-        # Add initial body positions
-        self.body_positions.add((self.row, self.column - 2))
-        self.body_positions.add((self.row, self.column - 1))
-        self.body_positions.add((self.row, self.column))
-
         # Place body parts on the grid
-        for body_part, (row, column) in zip(self.body_objects, self.body_positions):
+        for body_part, (row, column) in zip(self.body_objects, reversed(self.engine.positions()[:-1])):
             body_part.grid(row=row, column=column, sticky='news')
 
         # Place the snake's head on the grid
-        self.snake_head.grid(row=self.row, column=self.column)
+        self.snake_head.grid(row=self.engine.row, column=self.engine.column)
 
     def movement(self):
         """
         Handles the movement of the snake in the game.
 
-        This method updates the snake's position based on the current direction,
-        checks for collisions, updates the snake's body, and manages the game flow.
+        This method lets the engine move the snake by one cell, then updates the
+        widgets to match and manages the game flow.
 
         The method performs the following steps:
-        1. Updates the snake's head position based on the current direction.
+        1. Lets the engine move the snake's head and check for collisions.
         2. Checks if the game can continue.
         3. If the game can continue:
            - Handles potential apple collisions.
@@ -185,64 +217,112 @@ class Snake(ctk.CTk):
         defined by self.refresh_speed, creating the continuous movement of the snake.
         """
 
-        # Store the current direction and the old position of the snake's head
-        current_direction = self.direction
-        old_row = self.row
-        old_column = self.column
+        # Measure how long this tick takes and how late it fired, so the speed never exceeds what can be drawn
+        self.speed.begin_tick()
 
-        # Update the snake's head position based on the current direction
-        # DIRECTIONS is a dictionary mapping directions to coordinate changes
-        self.row += DIRECTIONS.get(current_direction)[1]
-        self.column += DIRECTIONS.get(current_direction)[0]
+        # Store the old position of the snake's head
+        old_row = self.engine.row
+        old_column = self.engine.column
 
-        # Check if the game can continue (e.g., no collisions with walls or self)
-        if self.can_game_continue():
+        # Move the snake and check if the game can continue (e.g., no collisions with walls or self)
+        if self.engine.step():
             # Check and handle if the snake has collided with an apple
             self.handle_apple_collision()
 
             # Update the position of the snake's head on the grid
-            self.snake_head.grid(row=self.row, column=self.column, sticky='news')
+            self.snake_head.grid(row=self.engine.row, column=self.engine.column, sticky='news')
 
             # Update the positions of the snake's body parts
-            self.update_body_positions(cur_row=self.row,
-                                       cur_col=self.column,
-                                       old_row=old_row,
-                                       old_col=old_column)
+            self.update_body_positions(old_row=old_row, old_col=old_column)
 
             # Schedule the next movement after a delay (self.refresh_speed)
-            self.after(self.refresh_speed, self.movement)
+            self.refresh_speed = self.speed.end_tick()
+            self.next_movement = self.after(self.refresh_speed, self.movement)
         else:
             # If the game cannot continue, trigger the game over sequence
             self.game_over()
 
-    def update_body_positions(self, cur_row, cur_col, old_row, old_col):
+    def widget_report(self):
+        """
+        Counts the live widgets of the window, to find widgets left behind by earlier games.
+
+        Every widget should be the head, the apple, a body part, a wall or portal, or one of
+        the three widgets of the game over page.
+
+        :return: The report.
+        """
+        widgets = len(self.winfo_children())
+        level_cells = len(self.level.cells('wall')) + len(self.level.cells('portal'))
+        expected = len(self.body_objects) + level_cells + 2 + (0 if self.engine.alive else 3)
+        return (f'{len(self.engine.body_positions)} segments, {len(self.body_objects)} body widgets, '
+                f'{widgets} widgets, {widgets - expected} not accounted for')
+
+    def toggle_pause(self, event=None):
+        """
+        Pauses or continues the game.
+
+        A paused game is saved to SAVE_PATH, so it can be continued after the window is
+        closed. The save is deleted again when the game continues.
+
+        Args:
+            event (tkinter.Event, optional): The key press, not used.
+
+        :return: None
+        """
+        if not self.engine.alive:
+            return
+
+        if self.paused:
+            self.paused = False
+            self.started += time.monotonic() - self.paused_at
+            discard_game(SAVE_PATH)
+            self.title('Snake')
+            self.movement()
+        else:
+            if self.next_movement is not None:
+                self.after_cancel(self.next_movement)
+                self.next_movement = None
+            self.speed.pause()
+            self.paused = True
+            self.paused_at = time.monotonic()
+            save_game(SAVE_PATH, self.engine, self.paused_at - self.started)
+            self.title('Snake (paused)')
+
+    def update_body_positions(self, old_row, old_col):
         """
         Updates the position of the snake's body parts.
 
         This method is responsible for moving the snake's body parts to follow
-        the head's movement. It updates both the visual representation and the
-        internal data structures tracking the snake's body.
+        the head's movement. The engine already tracks the body positions, so only
+        the visual representation is updated here.
 
         Args:
-        cur_row (int): The current row of the snake's head.
-        cur_col (int): The current column of the snake's head.
         old_row (int): The previous row of the snake's head.
         old_col (int): The previous column of the snake's head.
 
         The method performs the following operations:
         1. Removes the last body part from the list of body objects.
         2. Inserts this part at the beginning of the list (just behind the head).
-        3. Adds the current head position to the body positions.
-        4. Updates the grid position of the new first body part to the old head position.
+        3. Updates the grid position of the new first body part to the old head position.
 
         This creates the effect of the snake's body following its head as it moves.
         """
 
         last = self.body_objects.pop()
         self.body_objects.insert(0, last)
-        self.body_positions.add((cur_row, cur_col))
         self.body_objects[0].grid(row=old_row, column=old_col)
 
+    def close(self):
+        """
+        Saves a running game to SAVE_PATH and closes the window.
+
+        :return: None
+        """
+        if self.engine.alive:
+            now = self.paused_at if self.paused else time.monotonic()
+            save_game(SAVE_PATH, self.engine, now - self.started)
+        self.destroy()
+
     def game_over(self):
         """
         Handles the game over state and displays the end game screen.
@@ -256,9 +336,13 @@ class Snake(ctk.CTk):
         2. Creates a "Play Again" button that allows the player to restart the game.
            The button is positioned below the game over message and is linked to
            the start_game method.
+
+        3. Stores the game in the leaderboard and shows the best games below the button.
         """
+        results = self.leaderboard.finish(self.engine, time.monotonic() - self.started)
+
         ctk.CTkLabel(self,
-                     text=f'Game Over, record = {self.snake_body_length}',
+                     text=f'Game Over, record = {self.engine.snake_body_length}',
                      font=('helvetica', 30, 'bold')).place(relx=0.5, rely=0.5, anchor='center')
         ctk.CTkButton(self,
                       text='Play Again!',
@@ -266,58 +350,51 @@ class Snake(ctk.CTk):
                       text_color='black',
                       font=('B Titr', 25, 'bold')
                       ).place(relx=0.5, rely=0.6, anchor='center')
-
-    def can_game_continue(self):
-        """
-        Checks if the game is still ongoing.
-
-        This method determines whether the game should continue by checking two conditions:
-        1. The snake's head is within the bounds of the grid.
-        2. The snake's head has not collided with its own body (i.e., it has not hit its tail).
-
-        The grid bounds are defined as rows between 0 and 14 (inclusive) and columns between 0 and 19 (inclusive).
-        The method returns `True` if both conditions are met, indicating that the game is still on. Otherwise, it returns `False`.
-
-        :return: bool
-            `True` if the game is ongoing, `False` otherwise.
-        """
-        in_range = (TOP_LIMIT <= self.row < BOTTOM_LIMIT) and (LEFT_LIMIT <= self.column < RIGHT_LIMIT)
-        hit_its_tail = (self.row, self.column) in list(self.body_positions)
-        return in_range and not hit_its_tail
+        ctk.CTkLabel(self,
+                     text=results,
+                     font=('helvetica', 16)).place(relx=0.5, rely=0.67, anchor='n')
 
     def handle_apple_collision(self):
         """
         Checks if the snake's head has collided with the apple.
 
-        This method checks if the current position of the snake's head matches the position of the apple.
-        If a collision is detected (i.e., the snake's head is at the same row and column as the apple),
-        the following actions are performed:
+        The engine grows the snake and picks a new apple position when the head reaches
+        the apple. If that happened on the last tick, the following actions are performed:
 
-        1. The snake's tail length is increased by one.
-        2. The maximum size of the snake's body list is updated to reflect the new tail length.
-        3. The apple is removed from its current position on the grid.
-        4. A new random position is generated for the apple.
-        5. The speed for the snake's movement is increased by 5 milliseconds.
+        1. A new body part is created for the longer snake.
+        2. The apple is removed from its current position on the grid.
+        3. The apple is placed at its new position.
+        4. The speed scheduler moves one step along the difficulty curve.
 
         :return: None
         """
 
-        if self.row == self.apple_row and self.column == self.apple_column:
-            self.snake_body_length += 1
-            self.body_positions.max_size = self.snake_body_length
+        if self.engine.ate_apple:
             self.create_body_parts(number=1)
 
             self.apple.grid_forget()
             self.randomize_apple_position()
-            self.refresh_speed -= 5
+            self.refresh_speed = self.speed.apple_eaten()
+
+    def disable_effects(self):
+        """
+        Turns off the rendering effects that are expensive to draw.
+
+        This method is called by the speed scheduler when the target speed is faster than
+        what the window can sustain. The apple loses its rounded corners, which CustomTkinter
+        has to draw on a canvas every time the apple moves.
+
+        :return: None
+        """
+        self.apple.configure(corner_radius=0)
 
     def change_direction(self, event=None, direction=None):
         """
         Change the direction of the snake's movement.
 
-        This method updates the snake's direction based on the input, ensuring that
-        the snake cannot immediately reverse its direction. The new direction is only
-        applied if it's not directly opposite to the current direction.
+        This method passes the input to the engine, which ensures that the snake
+        cannot immediately reverse its direction. The new direction is only applied
+        if it's not directly opposite to the direction of the last movement.
 
         Parameters:
         event (tkinter.Event, optional): The event that triggered the direction change.
@@ -336,14 +413,7 @@ class Snake(ctk.CTk):
         Returns:
         None
         """
-        if self.direction == 'right' and direction != 'left':
-            self.direction = direction
-        elif self.direction == 'left' and direction != 'right':
-            self.direction = direction
-        elif self.direction == 'up' and direction != 'down':
-            self.direction = direction
-        elif self.direction == 'down' and direction != 'up':
-            self.direction = direction
+        self.engine.change_direction(direction)
 
     def create_body_parts(self, number: int = 1):
         """
@@ -376,5 +446,6 @@ class Snake(ctk.CTk):
             self.body_objects.append(body_part)
 
 
-app = Snake()
-app.mainloop()
+if __name__ == '__main__':
+    app = Snake()
+    app.mainloop()
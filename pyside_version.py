@@ -1,24 +1,55 @@
+import argparse
+import math
+import os
+import random
 import sys
-from random import randint
+import time
+from collections import deque
+from datetime import datetime
 
-from PySide6.QtCore import QSize, QTimer
-from PySide6.QtGui import QPalette, QColor, Qt, QFont, QIcon
+from PySide6.QtCore import QRect, QSize, QTimer
+from PySide6.QtGui import QPalette, QColor, Qt, QFont, QIcon, QPainter, QPixmap
 from PySide6.QtWidgets import QWidget, QApplication, QMainWindow, QGridLayout, QLabel, QStackedLayout, QVBoxLayout, \
     QPushButton
 from hPyT import *
 
+from capture import GameRecorder
+from controllers import Autopilot
+from engine import SnakeEngine
+from leaderboard import Leaderboard
+from level import load_level
 from settings import *
-from util import LimitedList
+from snapshot import discard_game, load_game, save_game
+from speed import SpeedScheduler
 
 
 class Board(QWidget):
-    def __init__(self):
+    def __init__(self, save_path=SAVE_PATH, leaderboard_path=LEADERBOARD_PATH):
+        """
+        Initialize the board and start a game, or continue the saved one.
+
+        Args:
+            save_path (str, optional): The file a running game is saved to.
+            leaderboard_path (str, optional): The database finished games are stored in.
+        """
         super().__init__()
-        self.set_background_color("#242424")
+        self.set_background_color(BACKGROUND_COLOR)
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
 
+        # Load the level once, it is reused by every game
+        self.level = load_level()
+        self.recorder = None  # Records the game while F9 recording is on
+        # Every finished game is stored, in the background
+        self.leaderboard = Leaderboard(leaderboard_path)
+        self.save_path = save_path
+
         self.setup_layout()
-        self.start_game()
+        # Continue the saved game if there is one, otherwise start a new game
+        try:
+            saved = load_game(self.save_path, self.level)
+        except (OSError, ValueError):  # A save from another level, or a broken one, cannot be continued
+            saved = None
+        self.start_game(saved)
 
     def set_background_color(self, color: str):
         palette = self.palette()
@@ -26,72 +57,93 @@ class Board(QWidget):
         self.setPalette(palette)
         self.setAutoFillBackground(True)  # Important to enable background color
 
-    def start_game(self):
+    def start_game(self, saved=None):
         """
         Initialize or reset the game state to start a new game.
 
         This method performs the following actions:
         1. Clears all existing widgets from the window.
-        2. Sets the initial direction of the snake.
+        2. Creates a new game engine, which holds the rules and the state of the game.
         3. Creates and positions the apple.
-        4. Sets initial game parameters (speed, snake length).
+        4. Sets initial game parameters (speed).
         5. Creates the snake's head and body parts.
         6. Positions the snake on the grid.
         7. Starts the snake's movement.
 
         This method can be called to start a new game or to reset the game after it ends.
+
+        Args:
+            saved (tuple, optional): A saved game, as returned by `load_game`. It is continued
+                                     instead of starting a new game, paused.
         """
         # Clear all existing snake parts from the window
         for widget in self.findChildren(QLabel):
-            if widget.objectName() != 'score_lbl':
+            if widget.objectName() not in ('score_lbl', 'leaderboard_lbl'):
                 widget.deleteLater()
 
         self.stacked_layout.setCurrentIndex(0)
 
-        # Set the initial direction of the snake
-        self.direction = 'right'
+        # The engine holds the rules, the snake's positions and the apple
+        if saved is None:
+            self.engine = SnakeEngine(level=self.level)
+            elapsed = 0.0
+        else:
+            self.engine, elapsed = saved
+        self.started = time.monotonic() - elapsed
 
-        # Create the apple and place it randomly on the grid
-        self.apple = self.create_object(APPLE_COLOR, apple=True)
+        # Set initial game parameters
+        # Decides the movement speed, the snake grows by one for every apple
+        self.speed = SpeedScheduler(on_degrade=self.disable_effects, apples=self.engine.snake_body_length - 3)
+        self.refresh_speed = self.speed.interval  # Movement speed of the snake
 
-        self.randomize_apple_position()
+        # Draw the walls and portals of the level
+        self.draw_level()
 
-        # Set initial game parameters
-        self.refresh_speed = 250  # Movement speed of the snake
-        self.snake_body_length = 3  # Initial length of the snake
+        # Create the apple and place it on the grid
+        self.apple = self.create_object(APPLE_COLOR, apple=True)
 
-        # Initialize the starting position of the snake's head
-        self.row = START_POS[1]
-        self.column = START_POS[0]
+        self.randomize_apple_position()
 
-        # Create a limited list to store the snake's body parts
-        self.body_positions = LimitedList(3)  # Stores positions of body parts
         self.body_objects = []  # Stores the actual body part widgets
 
         # Create the snake's head
         self.snake_head = self.create_object(SNAKE_HEAD_COLOR)
 
         # Create and add initial body parts to the snake's body list
-        self.create_body_parts(number=2)
+        self.create_body_parts(number=self.engine.snake_body_length - 1)
 
         self.initialize_snake_position()
 
         self.timer = QTimer()
-        self.timer.setInterval(REFRESH_SPEED)
+        self.timer.setInterval(self.refresh_speed)
         self.timer.timeout.connect(self.movement)
 
-        # Start the snake's movement
-        self.timer.start()
+        # Start the snake's movement, a continued game waits for the player
+        self.paused = False
+        if saved is None:
+            self.timer.start()
+        else:
+            self.toggle_pause()
+
+    def draw_level(self):
+        """
+        Places the walls and portals of the level on the grid.
+
+        :return: None
+        """
+        for kind, color in (('wall', WALL_COLOR), ('portal', PORTAL_COLOR)):
+            for row, column in self.level.cells(kind):
+                self.grid_layout.addWidget(self.create_object(color), row, column)
 
     def movement(self):
         """
         Handles the movement of the snake in the game.
 
-        This method updates the snake's position based on the current direction,
-        checks for collisions, updates the snake's body, and manages the game flow.
+        This method lets the engine move the snake by one cell, then updates the
+        widgets to match and manages the game flow.
 
         The method performs the following steps:
-        1. Updates the snake's head position based on the current direction.
+        1. Lets the engine move the snake's head and check for collisions.
         2. Checks if the game can continue.
         3. If the game can continue:
            - Handles potential apple collisions.
@@ -104,30 +156,31 @@ class Board(QWidget):
         defined by self.refresh_speed, creating the continuous movement of the snake.
         """
 
-        # Store the current direction and the old position of the snake's head
-        current_direction = self.direction
-        old_row = self.row
-        old_column = self.column
+        # Measure how long this tick takes and how late it fired, so the speed never exceeds what can be drawn
+        self.speed.begin_tick()
 
-        # Update the snake's head position based on the current direction
-        # DIRECTIONS is a dictionary mapping directions to coordinate changes
-        self.row += DIRECTIONS.get(current_direction)[1]
-        self.column += DIRECTIONS.get(current_direction)[0]
+        # Store the old position of the snake's head
+        old_row = self.engine.row
+        old_column = self.engine.column
 
-        # Check if the game can continue (e.g., no collisions with walls or self)
-        if self.can_game_continue():
+        # Move the snake and check if the game can continue (e.g., no collisions with walls or self)
+        if self.engine.step():
             # Check and handle if the snake has collided with an apple
             self.handle_apple_collision()
 
             # Update the position of the snake's head on the grid
-            self.grid_layout.addWidget(self.snake_head, self.row, self.column)
+            self.grid_layout.addWidget(self.snake_head, self.engine.row, self.engine.column)
 
             # Update the positions of the snake's body parts
-            self.update_body_positions(cur_row=self.row,
-                                       cur_col=self.column,
-                                       old_row=old_row,
-                                       old_col=old_column)
+            self.update_body_positions(old_row=old_row, old_col=old_column)
+
+            # Hand the new state to the recorder, which draws and encodes it on its own thread
+            if self.recorder is not None:
+                self.capture_frame()
 
+            self.refresh_speed = self.speed.end_tick()
+            if self.timer.interval() != self.refresh_speed:
+                self.timer.setInterval(self.refresh_speed)
         else:
             # If the game cannot continue, trigger the game over sequence
             self.game_over()
@@ -145,117 +198,112 @@ class Board(QWidget):
         2. Creates a "Play Again" button that allows the player to restart the game.
            The button is positioned below the game over message and is linked to
            the start_game method.
+
+        3. Stores the game in the leaderboard and shows the best games below the button.
         """
-        self.lbl_score.setText(f'Game Over, record = {self.snake_body_length}')
+        self.timer.stop()
+        if self.recorder is not None:
+            self.toggle_recording()
+        self.lbl_score.setText(f'Game Over, record = {self.engine.snake_body_length}')
+        self.lbl_leaderboard.setText(self.leaderboard.finish(self.engine, time.monotonic() - self.started))
         self.stacked_layout.setCurrentIndex(1)
 
-    def update_body_positions(self, cur_row, cur_col, old_row, old_col):
+    def update_body_positions(self, old_row, old_col):
         """
         Updates the position of the snake's body parts.
 
         This method is responsible for moving the snake's body parts to follow
-        the head's movement. It updates both the visual representation and the
-        internal data structures tracking the snake's body.
+        the head's movement. The engine already tracks the body positions, so only
+        the visual representation is updated here.
 
         Args:
-        cur_row (int): The current row of the snake's head.
-        cur_col (int): The current column of the snake's head.
         old_row (int): The previous row of the snake's head.
         old_col (int): The previous column of the snake's head.
 
         The method performs the following operations:
         1. Removes the last body part from the list of body objects.
         2. Inserts this part at the beginning of the list (just behind the head).
-        3. Adds the current head position to the body positions.
-        4. Updates the grid position of the new first body part to the old head position.
+        3. Updates the grid position of the new first body part to the old head position.
 
         This creates the effect of the snake's body following its head as it moves.
         """
 
         last = self.body_objects.pop()
         self.body_objects.insert(0, last)
-        self.body_positions.add((cur_row, cur_col))
         self.grid_layout.addWidget(self.body_objects[0], old_row, old_col)
 
     def handle_apple_collision(self):
         """
         Checks if the snake's head has collided with the apple.
 
-        This method checks if the current position of the snake's head matches the position of the apple.
-        If a collision is detected (i.e., the snake's head is at the same row and column as the apple),
-        the following actions are performed:
+        The engine grows the snake and picks a new apple position when the head reaches
+        the apple. If that happened on the last tick, the following actions are performed:
 
-        1. The snake's tail length is increased by one.
-        2. The maximum size of the snake's body list is updated to reflect the new tail length.
-        3. The apple is removed from its current position on the grid.
-        4. A new random position is generated for the apple.
-        5. The speed for the snake's movement is increased by 5 milliseconds.
+        1. A new body part is created for the longer snake.
+        2. The apple is removed from its current position on the grid.
+        3. The apple is placed at its new position.
+        4. The speed scheduler moves one step along the difficulty curve.
 
         :return: None
         """
 
-        if self.row == self.apple_row and self.column == self.apple_column:
-            self.snake_body_length += 1
-            self.body_positions.max_size = self.snake_body_length
+        if self.engine.ate_apple:
             self.create_body_parts(number=1)
 
             self.grid_layout.removeWidget(self.apple)
 
             self.randomize_apple_position()
-            self.refresh_speed -= 5
+            self.refresh_speed = self.speed.apple_eaten()
             self.timer.setInterval(self.refresh_speed)
 
-    def can_game_continue(self):
+    def disable_effects(self):
         """
-        Checks if the game is still ongoing.
-
-        This method determines whether the game should continue by checking two conditions:
-        1. The snake's head is within the bounds of the grid.
-        2. The snake's head has not collided with its own body (i.e., it has not hit its tail).
+        Turns off the rendering effects that are expensive to draw.
 
-        The grid bounds are defined as rows between 0 and 14 (inclusive) and columns between 0 and 19 (inclusive).
-        The method returns `True` if both conditions are met, indicating that the game is still on. Otherwise, it returns `False`.
+        This method is called by the speed scheduler when the target speed is faster than
+        what the window can sustain. Every object is restyled without the transparent
+        border and the rounded corners, and objects created later are plain as well.
 
-        :return: bool
-            `True` if the game is ongoing, `False` otherwise.
+        :return: None
         """
-        in_range = (TOP_LIMIT <= self.row < BOTTOM_LIMIT) and (LEFT_LIMIT <= self.column < RIGHT_LIMIT)
-        hit_its_tail = (self.row, self.column) in list(self.body_positions)
-        return in_range and not hit_its_tail
+        for widget in [self.apple, self.snake_head, *self.body_objects]:
+            widget.setStyleSheet(self.object_style(widget.property('color')))
 
     def initialize_snake_position(self):
         """
         Initialize the starting position of the snake on the grid.
 
-        This method sets up the initial body positions of the snake,
-        places the body parts on the grid, and positions the snake's head.
+        This method places the body parts on the grid at the body positions of the
+        engine, and positions the snake's head. The first body part is the one just
+        behind the head, as `update_body_positions` expects.
         """
 
-        # Add initial body positions
-        self.body_positions.add((self.row, self.column - 2))
-        self.body_positions.add((self.row, self.column - 1))
-        self.body_positions.add((self.row, self.column))
-
         # Place body parts on the grid
-        for body_part, (row, column) in zip(self.body_objects, self.body_positions):
+        for body_part, (row, column) in zip(self.body_objects, reversed(self.engine.positions()[:-1])):
             self.grid_layout.addWidget(body_part, row, column)
 
         # Place the snake's head on the grid
-        self.grid_layout.addWidget(self.snake_head, self.row, self.column)
+        self.grid_layout.addWidget(self.snake_head, self.engine.row, self.engine.column)
 
     def create_object(self, color: str, apple=False) -> QLabel:
-        border_radius = 5 if apple else 0
         body_part = QLabel()
-        body_part.setStyleSheet(f"background-color: {color}; border: 2px solid transparent; border-radius:{border_radius}px")
+        body_part.setProperty('color', color)
+        body_part.setStyleSheet(self.object_style(color, apple))
         return body_part
 
+    def object_style(self, color: str, apple=False) -> str:
+        if not self.speed.effects_enabled:
+            return f"background-color: {color}"
+        border_radius = 5 if apple else 0
+        return f"background-color: {color}; border: 2px solid transparent; border-radius:{border_radius}px"
+
     def change_direction(self, direction=None):
         """
         Change the direction of the snake's movement.
 
-        This method updates the snake's direction based on the input, ensuring that
-        the snake cannot immediately reverse its direction. The new direction is only
-        applied if it's not directly opposite to the current direction.
+        This method passes the input to the engine, which ensures that the snake
+        cannot immediately reverse its direction. The new direction is only applied
+        if it's not directly opposite to the direction of the last movement.
 
         Parameters:
         event (tkinter.Event, optional): The event that triggered the direction change.
@@ -274,14 +322,7 @@ class Board(QWidget):
         Returns:
         None
         """
-        if self.direction == 'right' and direction != 'left':
-            self.direction = direction
-        elif self.direction == 'left' and direction != 'right':
-            self.direction = direction
-        elif self.direction == 'up' and direction != 'down':
-            self.direction = direction
-        elif self.direction == 'down' and direction != 'up':
-            self.direction = direction
+        self.engine.change_direction(direction)
 
     def keyPressEvent(self, event):
         """
@@ -296,6 +337,9 @@ class Board(QWidget):
         - Left arrow key changes the direction to 'left'.
         - Right arrow key changes the direction to 'right'.
 
+        P pauses and continues the game, F9 starts and stops recording, F10 prints the
+        widget counts (see `widget_report`).
+
         :return: None
         """
         if event.key() == Qt.Key.Key_Up:
@@ -306,37 +350,141 @@ class Board(QWidget):
             self.change_direction('right')
         elif event.key() == Qt.Key.Key_Left:
             self.change_direction('left')
+        elif event.key() == Qt.Key.Key_P:
+            self.toggle_pause()
+        elif event.key() == Qt.Key.Key_F9:
+            self.toggle_recording()
+        elif event.key() == Qt.Key.Key_F10:
+            print(self.widget_report(), file=sys.stderr)
+
+    def widget_report(self):
+        """
+        Counts the live widgets of the board, to find widgets left behind by earlier games.
 
-    def randomize_apple_position(self):
+        Every label should be the head, the apple, a body part, a wall or portal, or one of
+        the two labels of the game over page.
+
+        :return: The report.
+        """
+        return (f'{len(self.engine.body_positions)} segments, {len(self.body_objects)} body widgets, '
+                f'{len(self.findChildren(QLabel))} labels, {self.unaccounted_labels()} not accounted for')
+
+    def unaccounted_labels(self):
+        """
+        Counts the labels that are not part of the current game, see `widget_report`.
+
+        :return: The number of labels left behind, 0 if there are none.
+        """
+        level_cells = len(self.level.cells('wall')) + len(self.level.cells('portal'))
+        expected = len(self.body_objects) + level_cells + 4
+        return len(self.findChildren(QLabel)) - expected
+
+    def toggle_pause(self):
+        """
+        Pauses or continues the game.
+
+        A paused game is saved to `save_path`, so it can be continued after the window is
+        closed. The save is deleted again when the game continues.
+
+        :return: None
+        """
+        if not self.engine.alive:
+            return
+
+        if self.paused:
+            self.paused = False
+            self.started += time.monotonic() - self.paused_at
+            discard_game(self.save_path)
+            self.timer.start()
+        else:
+            self.timer.stop()
+            self.speed.pause()
+            self.paused = True
+            self.paused_at = time.monotonic()
+            save_game(self.save_path, self.engine, self.paused_at - self.started)
+        self.window().setWindowTitle(self.window_title())
+
+    def save(self):
+        """
+        Saves a running game to `save_path`, so it is continued on the next start.
+
+        :return: None
+        """
+        if self.engine.alive:
+            now = self.paused_at if self.paused else time.monotonic()
+            save_game(self.save_path, self.engine, now - self.started)
+
+    def window_title(self):
         """
-        Randomizes the position of the apple on the grid.
+        Get the window title, which shows whether the game is paused or recorded.
 
-        This method generates a random position for the apple within the bounds of the grid
-        defined by the `FIELDS` constant. The apple's row and column indices are set to random
-        values within the allowable range, and the apple is placed at the new position on the grid.
+        :return: The title.
+        """
+        title = 'Snake Game'
+        if self.paused:
+            title += ' (paused)'
+        if self.recorder is not None:
+            title += ' (recording)'
+        return title
+
+    def toggle_recording(self):
+        """
+        Starts or stops recording the game into a GIF or video clip.
+
+        Frames are drawn offscreen from the engine state and encoded on a background
+        thread, so recording does not slow the game down. A recording also stops when
+        the game is over. Clips are written to the CAPTURE_DIR folder.
 
         :return: None
         """
+        if self.recorder is None:
+            os.makedirs(CAPTURE_DIR, exist_ok=True)
+            name = datetime.now().strftime('snake-%Y%m%d-%H%M%S')
+            self.recorder = GameRecorder(os.path.join(CAPTURE_DIR, f'{name}.{CAPTURE_FORMAT}'), self.level)
+            self.window().setWindowTitle(self.window_title())
+            self.capture_frame()
+        else:
+            self.recorder.close()
+            self.recorder = None
+            self.window().setWindowTitle(self.window_title())
 
-        # Calculate the maximum possible row and column indices
-        # Subtract 1 from FIELDS dimensions to account for 0-based indexing
-        max_row_index = FIELDS[1] - 1
-        max_column_index = FIELDS[0] - 1
+    def capture_frame(self):
+        """
+        Hands the current state of the game to the recorder.
+
+        If the recorder has failed (for example because ffmpeg is not installed for video
+        clips), the error is printed and recording stops.
 
-        # Generate random row and column indices for the apple
-        self.apple_row = randint(0, max_row_index)
-        self.apple_column = randint(0, max_column_index)
+        :return: None
+        """
+        try:
+            self.recorder.capture(self.engine, self.refresh_speed)
+        except RuntimeError as error:
+            print(error, file=sys.stderr)
+            self.toggle_recording()
+
+    def randomize_apple_position(self):
+        """
+        Places the apple on the grid.
 
-        # Place the apple at the randomly generated position on the grid
-        # The 'grid' method is used to position the apple widget
-        self.grid_layout.addWidget(self.apple, self.apple_row, self.apple_column)
+        The engine picks the random position of the apple, this method moves the apple
+        widget there. If the snake fills the whole board, the apple is hidden.
+
+        :return: None
+        """
+        if self.engine.apple_row is None:
+            self.apple.hide()
+            return
+
+        # Place the apple at the position picked by the engine
+        self.grid_layout.addWidget(self.apple, self.engine.apple_row, self.engine.apple_column)
 
     def setup_layout(self):
         """
         Configures the grid layout for the window.
 
         This method sets up the grid layout for the window by configuring the rows and columns
-        based on the number of rows and columns specified in the `FIELDS` constant. Each row and
+        based on the number of rows and columns of the level (the `LEVEL` setting). Each row and
         column is configured to have an equal weight and uniform size, ensuring that the grid
         cells are evenly distributed across the window.
 
@@ -362,8 +510,8 @@ class Board(QWidget):
         self.grid_layout.setContentsMargins(0, 0, 0, 0)
         self.grid_layout.setSpacing(0)
 
-        number_of_rows = FIELDS[1]
-        number_of_columns = FIELDS[0]
+        number_of_rows = self.level.height
+        number_of_columns = self.level.width
 
         # creating the rows
         for row in range(number_of_rows):
@@ -380,14 +528,21 @@ class Board(QWidget):
         self.lbl_score.setStyleSheet("color: white")
         self.lbl_score.setFont(QFont('helvetica', 30, QFont.Weight.Bold))
 
+        self.lbl_leaderboard = QLabel()
+        self.lbl_leaderboard.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        self.lbl_leaderboard.setObjectName('leaderboard_lbl')
+        self.lbl_leaderboard.setStyleSheet("color: white")
+        self.lbl_leaderboard.setFont(QFont('helvetica', 16))
+
         btn_play_again = QPushButton('Play again?')
         btn_play_again.setFont(QFont('helvetica', 30, QFont.Weight.Bold))
         btn_play_again.setFixedSize(250, 100)
-        btn_play_again.clicked.connect(self.start_game)
+        btn_play_again.clicked.connect(lambda: self.start_game())
         # Add these widgets to the layout
         second_layout.addStretch()
         second_layout.addWidget(self.lbl_score)
         second_layout.addWidget(btn_play_again, alignment=Qt.AlignmentFlag.AlignCenter)
+        second_layout.addWidget(self.lbl_leaderboard)
         second_layout.addStretch()
 
     def create_body_parts(self, number: int = 1):
@@ -421,22 +576,236 @@ class Board(QWidget):
             self.body_objects.append(body_part)
 
 
+class Mosaic(QWidget):
+    """
+    A widget showing many headless games at once, each in its own tile.
+
+    The games are plain engines steered by a controller, without any widgets of their
+    own. The whole mosaic is painted by a single `paintEvent` with QPainter, so the cost
+    does not grow with the number of snake segments, only with the number of tiles drawn.
+
+    Repaints are throttled per tile: a tile that changed is queued once, and every frame
+    only the longest waiting tiles are repainted, at most MOSAIC_TILE_REPAINTS per second
+    in total. With many games each tile is refreshed less often, but a frame never costs
+    more than that budget. A game that ends is replaced by a new one with the next seed.
+    """
+
+    def __init__(self, count=MOSAIC_GAMES, controller=Autopilot, seed=None):
+        """
+        Initialize the mosaic and start the games.
+
+        Args:
+            count (int, optional): The number of games.
+            controller (type, optional): Creates the controller of every game.
+            seed (int, optional): The seed of the first game, the others follow it. A random
+                                  seed by default, like a single game.
+        """
+        super().__init__()
+        self.level = load_level()
+        self.controller = controller
+        self.next_seed = random.randrange(2 ** 32) if seed is None else seed
+        self.games = [self.new_game() for _ in range(count)]
+        self.finished = 0
+        self.best_score = 0
+
+        # Tiles that changed since they were last painted, longest waiting first
+        self.dirty = deque()
+        self.queued = [False] * count
+        self.tiles_per_frame = max(1, MOSAIC_TILE_REPAINTS // MOSAIC_FPS)
+
+        self.colors = {'body': QColor(SNAKE_BODY_COLOR), 'head': QColor(SNAKE_HEAD_COLOR),
+                       'apple': QColor(APPLE_COLOR), 'gap': QColor('black')}
+        self.layout_tiles()
+
+        self.tick_timer = QTimer(self)
+        self.tick_timer.setInterval(1000 // MOSAIC_TICKS_PER_SECOND)
+        self.tick_timer.timeout.connect(self.step)
+        self.tick_timer.start()
+
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setInterval(1000 // MOSAIC_FPS)
+        self.frame_timer.timeout.connect(self.refresh)
+        self.frame_timer.start()
+
+    def new_game(self):
+        """
+        Create a game with the next seed.
+
+        :return: The engine and its controller.
+        """
+        engine = SnakeEngine(self.next_seed, self.level)
+        self.next_seed += 1
+        return engine, self.controller()
+
+    def step(self):
+        """
+        Moves every game by one tick and queues the tiles for repainting.
+
+        :return: None
+        """
+        for index, (engine, controller) in enumerate(self.games):
+            controller.act(engine)
+            if not engine.step():
+                self.finished += 1
+                self.best_score = max(self.best_score, engine.score)
+                self.games[index] = self.new_game()
+                self.window().setWindowTitle(self.window_title())
+            if not self.queued[index]:
+                self.queued[index] = True
+                self.dirty.append(index)
+
+    def refresh(self):
+        """
+        Schedules a repaint of the tiles that waited longest, within the frame budget.
+
+        Qt combines the requested rectangles into a single paint event.
+
+        :return: None
+        """
+        for _ in range(min(self.tiles_per_frame, len(self.dirty))):
+            index = self.dirty.popleft()
+            self.queued[index] = False
+            self.update(self.tile_rect(index))
+
+    def window_title(self):
+        """
+        Get the window title, which shows how the games went so far.
+
+        :return: The title.
+        """
+        return f'Snake Mosaic, {len(self.games)} games, {self.finished} finished, best score {self.best_score}'
+
+    def layout_tiles(self):
+        """
+        Splits the widget into a square-ish grid of tiles and draws the level into a
+        pixmap, which every tile starts from.
+
+        :return: None
+        """
+        self.columns = math.ceil(math.sqrt(len(self.games)))
+        self.rows = math.ceil(len(self.games) / self.columns)
+        tile_width = max(1, self.width() // self.columns - MOSAIC_GAP)
+        tile_height = max(1, self.height() // self.rows - MOSAIC_GAP)
+        self.cell_size = max(1, min(tile_width // self.level.width, tile_height // self.level.height))
+
+        size = self.cell_size
+        self.background = QPixmap(self.level.width * size, self.level.height * size)
+        self.background.fill(QColor(BACKGROUND_COLOR))
+        painter = QPainter(self.background)
+        for kind, color in (('wall', WALL_COLOR), ('portal', PORTAL_COLOR)):
+            for row, column in self.level.cells(kind):
+                painter.fillRect(column * size, row * size, size, size, QColor(color))
+        painter.end()
+
+    def tile_rect(self, index):
+        """
+        Get the rectangle of a tile.
+
+        Args:
+            index (int): The index of the game.
+
+        :return: The rectangle, in widget coordinates.
+        """
+        row, column = divmod(index, self.columns)
+        width = self.background.width()
+        height = self.background.height()
+        return QRect(column * (width + MOSAIC_GAP), row * (height + MOSAIC_GAP), width, height)
+
+    def resizeEvent(self, event):
+        self.layout_tiles()
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        """
+        Paints the tiles inside the region Qt asks for, in one pass.
+
+        :return: None
+        """
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), self.colors['gap'])
+        # Only the tiles under the requested rectangles are looked at, not every game
+        pitch_x = self.background.width() + MOSAIC_GAP
+        pitch_y = self.background.height() + MOSAIC_GAP
+        tiles = set()
+        for rect in event.region():
+            for row in range(rect.top() // pitch_y, min(self.rows - 1, rect.bottom() // pitch_y) + 1):
+                for column in range(rect.left() // pitch_x, min(self.columns - 1, rect.right() // pitch_x) + 1):
+                    tiles.add(row * self.columns + column)
+        for index in sorted(tiles):
+            if index < len(self.games):
+                self.paint_tile(painter, self.tile_rect(index), self.games[index][0])
+        painter.end()
+
+    def paint_tile(self, painter, rect, engine):
+        """
+        Paints a single game.
+
+        Args:
+            painter (QPainter): The painter of the widget.
+            rect (QRect): The tile.
+            engine (SnakeEngine): The game.
+
+        :return: None
+        """
+        painter.drawPixmap(rect.topLeft(), self.background)
+        size = self.cell_size
+        left = rect.left()
+        top = rect.top()
+        width = engine.tables.width
+        color = self.colors['body']
+        for cell in engine.body_positions:
+            row, column = divmod(cell, width)
+            painter.fillRect(left + column * size, top + row * size, size, size, color)
+        row, column = divmod(engine.head, width)
+        painter.fillRect(left + column * size, top + row * size, size, size, self.colors['head'])
+        if engine.apple is not None:
+            row, column = divmod(engine.apple, width)
+            painter.fillRect(left + column * size, top + row * size, size, size, self.colors['apple'])
+
+
+class MosaicWindow(QMainWindow):
+    def __init__(self, count=MOSAIC_GAMES):
+        super().__init__()
+        self.resize(QSize(WINDOW_SIZE[0], WINDOW_SIZE[1]))
+        self.setWindowIcon(QIcon('empty.ico'))
+
+        self.mosaic = Mosaic(count)
+        self.setCentralWidget(self.mosaic)
+        self.setWindowTitle(self.mosaic.window_title())
+
+
 class SnakeGame(QMainWindow):
     def __init__(self):
         super().__init__()
         self.resize(QSize(WINDOW_SIZE[0], WINDOW_SIZE[1]))
-        self.setWindowTitle('Snake Game')
         self.set_titlebar_color()
         self.setWindowIcon(QIcon('empty.ico'))
 
         self.board = Board()
         self.setCentralWidget(self.board)
+        self.setWindowTitle(self.board.window_title())
+
+    def closeEvent(self, event):
+        # Let a running recording finish writing its file
+        if self.board.recorder is not None:
+            self.board.toggle_recording()
+        # A running game is continued on the next start
+        self.board.save()
+        super().closeEvent(event)
 
     def set_titlebar_color(self):
         title_bar_color.set(self, '#000000')  # sets the titlebar color to white
 
 
-app = QApplication(sys.argv)
-window = SnakeGame()
-window.show()
-app.exec()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play Snake.')
+    parser.add_argument('--mosaic', type=int, metavar='GAMES',
+                        help='watch this many autopilot games at once instead of playing')
+    arguments, qt_arguments = parser.parse_known_args()
+    if arguments.mosaic is not None and arguments.mosaic < 1:
+        parser.error('--mosaic must be at least 1')
+
+    app = QApplication(sys.argv[:1] + qt_arguments)
+    window = SnakeGame() if arguments.mosaic is None else MosaicWindow(arguments.mosaic)
+    window.show()
+    app.exec()
@@ -0,0 +1,135 @@
+import json
+
+from controllers import ReplayController
+from engine import SnakeEngine
+from level import load_level
+
+
+class Replay:
+    """
+    A class representing a recorded game.
+
+    A game is fully described by its level, its seed and the accepted direction changes,
+    everything else can be recomputed by playing it again. The score, length and death
+    cause are stored as well, so archives can be summarised without replaying them.
+
+    Attributes:
+        seed (int): The seed of the game.
+        level (str): The path of the level file, or None for the plain board.
+        inputs (list): The accepted direction changes as (tick, direction) pairs.
+        controller (str): The name of whoever played the game.
+        score (int): The final score.
+        ticks (int): The number of ticks the game lasted.
+        death_cause (str): 'wall' or 'tail', or None if the game did not end.
+    """
+
+    def __init__(self, seed, inputs, controller='keyboard', score=None, ticks=None, death_cause=None,
+                 level=None):
+        self.seed = seed
+        self.level = level
+        self.inputs = inputs
+        self.controller = controller
+        self.score = score
+        self.ticks = ticks
+        self.death_cause = death_cause
+
+    @classmethod
+    def from_engine(cls, engine, controller='keyboard'):
+        """
+        Create a replay of a game.
+
+        Args:
+            engine (SnakeEngine): The played game.
+            controller (str, optional): The name of whoever played the game.
+
+        Returns:
+            Replay: The recorded game.
+        """
+        return cls(engine.seed, list(engine.inputs), controller, engine.score, engine.ticks, engine.death_cause,
+                   engine.level.path)
+
+    @classmethod
+    def from_json(cls, line):
+        """
+        Create a replay from a line of a replay archive.
+
+        Args:
+            line (str): The JSON encoded replay.
+
+        Returns:
+            Replay: The decoded replay.
+        """
+        data = json.loads(line)
+        data['inputs'] = [tuple(item) for item in data['inputs']]
+        return cls(**data)
+
+    def to_json(self):
+        """
+        Encode the replay as a single line of JSON.
+
+        Returns:
+            str: The encoded replay, without a trailing newline.
+        """
+        return json.dumps({'seed': self.seed, 'inputs': self.inputs, 'controller': self.controller,
+                           'score': self.score, 'ticks': self.ticks, 'death_cause': self.death_cause,
+                           'level': self.level},
+                          separators=(',', ':'))
+
+    def start(self):
+        """
+        Set up the game of the replay, before its first tick.
+
+        Returns:
+            tuple: The engine and the controller repeating the recorded inputs.
+        """
+        return SnakeEngine(self.seed, load_level(self.level)), ReplayController(self.inputs)
+
+    def play(self, max_ticks=None, on_tick=None):
+        """
+        Play the replay again from the start.
+
+        Args:
+            max_ticks (int, optional): Stop after this many ticks even if the game goes on.
+            on_tick (callable, optional): Called with the engine after every tick.
+
+        Returns:
+            SnakeEngine: The engine in its final state.
+        """
+        engine, controller = self.start()
+        while engine.alive and (max_ticks is None or engine.ticks < max_ticks):
+            controller.act(engine)
+            engine.step()
+            if on_tick is not None:
+                on_tick(engine)
+        return engine
+
+
+def save_replay(path, replay):
+    """
+    Append a replay to a replay archive.
+
+    An archive is a text file with one JSON encoded replay per line, so it can be
+    appended to while games are played and read back one game at a time.
+
+    Args:
+        path (str): The path of the archive.
+        replay (Replay): The replay to store.
+    """
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write(replay.to_json() + '\n')
+
+
+def iter_replays(path):
+    """
+    Read the replays of an archive one by one.
+
+    Args:
+        path (str): The path of the archive.
+
+    Yields:
+        Replay: The replays, in the order they were saved.
+    """
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield Replay.from_json(line)
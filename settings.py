@@ -7,13 +7,84 @@ START_POS = (5, int(FIELDS[1] / 2))
 DIRECTIONS = {'left': [-1, 0], 'right': [1, 0], 'up': [0, -1], 'down': [0, 1]}
 REFRESH_SPEED = 250
 
-# field limits 
-LEFT_LIMIT = 0
-TOP_LIMIT = 0
-RIGHT_LIMIT = FIELDS[0]
-BOTTOM_LIMIT = FIELDS[1]
+# speed
+SPEED_CURVE = 'linear'  # one of 'linear', 'exponential', 'stepped'
+SPEED_STEP = 5  # milliseconds taken off the interval per apple
+SPEED_FACTOR = 0.97  # interval multiplier per apple for the exponential curve
+SPEED_STEP_EVERY = 5  # apples per step for the stepped curve
+MIN_REFRESH_SPEED = 60
+MAX_REFRESH_SPEED = 2 * REFRESH_SPEED  # the longest interval a slow frontend can force
+FRAME_HEADROOM = 2  # the interval must be at least this many times the measured tick cost
+TICK_COST_SMOOTHING = 0.2
+TICK_LATENESS_TOLERANCE = 4  # milliseconds a timer may fire late before the tick counts as late
+
+# levels
+LEVEL = None  # path of a level file, None plays on a plain FIELDS sized rectangle
+LEVELS_DIR = 'levels'  # relative level paths are also looked up here
+LEVEL_CACHE_SIZE = 16
+DISTANCE_CACHE_SIZE = 1 << 20  # shortest path distances kept per level, in cells (4 bytes each)
+WALL_CHAR = '#'
 
 # colors 
 SNAKE_BODY_COLOR = '#8EF249'
 SNAKE_HEAD_COLOR = '#71CC1D'
 APPLE_COLOR = '#F9473E'
+BACKGROUND_COLOR = '#242424'
+WALL_COLOR = '#6B6B6B'
+PORTAL_COLOR = '#3E9CF9'
+
+# recording
+CAPTURE_DIR = 'recordings'
+CAPTURE_FORMAT = 'gif'  # 'gif', or a video format such as 'mp4' (needs ffmpeg)
+CAPTURE_CELL_SIZE = 20  # pixels per cell
+CAPTURE_QUEUE_SIZE = 64  # frames that may wait for the encoder before frames are dropped
+CAPTURE_VIDEO_FPS = 30
+CAPTURE_GIF_MAX_FRAMES = 600  # frames a GIF holds at most, they are kept in memory until it is written
+CAPTURE_POLL_INTERVAL = 0.1  # seconds the encoder waits for a frame before checking whether recording stopped
+
+# leaderboard
+LEADERBOARD_PATH = 'leaderboard.db'
+LEADERBOARD_SIZE = 5  # games shown on the game over page
+LEADERBOARD_BATCH_SIZE = 500  # games written in one transaction at most
+LEADERBOARD_FLUSH_INTERVAL = 0.5  # seconds the writer waits for more games before writing
+LEADERBOARD_WRITE_ATTEMPTS = 3  # tries to write a batch, for example while another window holds the lock
+LEADERBOARD_RETRY_DELAY = 1.0  # seconds waited after the first failed try, growing with every try
+PLAYER_NAME = None  # None uses the login name
+
+# replay analytics
+ANALYTICS_CHUNK_SIZE = 64  # replays sent to a worker process at once
+
+# fuzzing
+FUZZ_BATCH_SIZE = 20  # games sent to a worker process at once
+FUZZ_MAX_TICKS = 5000  # ticks per game at most
+FUZZ_REPORT_INTERVAL = 10  # seconds between progress reports
+FUZZ_FAILURES_PATH = 'fuzz-failures.jsonl'
+
+# memory diagnostics
+DIAGNOSTICS_SEGMENT_LENGTH = 10_000  # the snake length bytes per segment are measured at
+DIAGNOSTICS_SEGMENT_BUDGET = 64  # bytes per body segment at most
+DIAGNOSTICS_RESTARTS = 50  # games played to measure what restarts leave behind
+DIAGNOSTICS_RESTART_BUDGET = 16 * 1024  # bytes all those restarts may leave behind
+DIAGNOSTICS_WIDGET_RESTARTS = 10  # games played in the offscreen PySide6 board by the check
+DIAGNOSTICS_SAMPLE_EVERY = 100  # ticks between tracemalloc snapshots
+DIAGNOSTICS_TOP = 5  # allocating source lines listed per tick phase
+
+# tournaments
+TOURNAMENT_MAX_TICKS = 10_000  # ticks per game at most, so controllers that never die still finish
+TOURNAMENT_BATCH_SIZE = 50  # games sent to a worker process at once
+TOURNAMENT_HISTOGRAM_BITS = 5  # significant bits of a decision time the histogram keeps, percentiles are within 1/16
+
+# save game
+SAVE_PATH = 'savegame.snk'  # a paused or closed game is saved here and resumed on the next start
+
+# mosaic viewer
+MOSAIC_GAMES = 64
+MOSAIC_TICKS_PER_SECOND = 20  # ticks of every game per second
+MOSAIC_FPS = 30
+MOSAIC_TILE_REPAINTS = 600  # tiles repainted per second at most, however many games are shown
+MOSAIC_GAP = 2  # pixels between the tiles
+
+# terminal frontend
+TERMINAL_BACKGROUND_COLOR = BACKGROUND_COLOR
+TERMINAL_TICKS_PER_SECOND = 0  # 0 runs as fast as possible
+TERMINAL_MAX_TICKS = 100_000  # autopilot games are ended after this many ticks, in case the snake circles forever
@@ -0,0 +1,192 @@
+import os
+import struct
+import zlib
+from array import array
+from random import Random
+
+from engine import SnakeEngine
+from level import load_level
+from tables import DIRECTION_CODES, DIRECTION_NAMES
+from util import LimitedList
+
+MAGIC = b'SNK1'
+# magic, board width and height, seed, ticks, length, direction, moved direction, apple (-1 for none),
+# elapsed seconds, RNG version, whether a gauss value is pending, the pending gauss value
+HEADER = struct.Struct('<4sIIQQIBBidB?d')
+RNG_STATE = struct.Struct('<625I')
+COUNT = struct.Struct('<I')
+
+
+def dump_snapshot(engine, elapsed=0.0):
+    """
+    Serialize the state of a running game into a compact binary snapshot.
+
+    The snapshot holds everything needed to continue the game exactly where it was:
+    the body cells from the tail to the head, the direction, the apple, the length
+    (from which the speed follows), the RNG state and the recorded inputs, so a
+    resumed game can still be saved as a replay. The occupancy bitmap is stored as well,
+    compressed, so loading does not have to mark every body cell one by one.
+
+    Args:
+        engine (SnakeEngine): The game.
+        elapsed (float, optional): How long the game has been played, in seconds.
+
+    Returns:
+        bytes: The snapshot.
+    """
+    version, state, gauss = engine.rng.getstate()
+    apple = -1 if engine.apple is None else engine.apple
+    parts = [HEADER.pack(MAGIC, engine.level.width, engine.level.height, engine.seed, engine.ticks,
+                         engine.snake_body_length, engine.direction, engine.moved_direction, apple, elapsed,
+                         version, gauss is not None, gauss or 0.0),
+             RNG_STATE.pack(*state)]
+
+    level = (engine.level.path or '').encode()
+    parts += [COUNT.pack(len(level)), level]
+
+    input_ticks = array('I', [tick for tick, _ in engine.inputs])
+    input_codes = bytes(DIRECTION_CODES[direction] for _, direction in engine.inputs)
+    parts += [COUNT.pack(len(input_codes)), input_ticks.tobytes(), input_codes]
+
+    # Two bytes per cell is enough for boards of up to 65536 cells
+    body = array('H' if engine.tables.cells <= 0x10000 else 'I', engine.body_positions)
+    parts += [body.typecode.encode(), COUNT.pack(len(body)), body.tobytes()]
+
+    occupied = zlib.compress(engine.occupied, 1)
+    parts += [COUNT.pack(len(occupied)), occupied]
+    return b''.join(parts)
+
+
+def load_snapshot(data, level=None):
+    """
+    Rebuild a game from a snapshot, without replaying it.
+
+    Args:
+        data (bytes): The snapshot, as made by `dump_snapshot`.
+        level (Level, optional): The level to continue the game on, which must be the level
+                                 it was saved on. By default the level file stored in the
+                                 snapshot is loaded, or the plain board if there is none.
+
+    Returns:
+        tuple: The engine and the number of seconds the game had been played.
+
+    Raises:
+        ValueError: If the data is not a snapshot or does not match the level.
+    """
+    view = memoryview(data)
+    (magic, width, height, seed, ticks, length, direction, moved_direction, apple, elapsed,
+     version, has_gauss, gauss) = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError('not a snake snapshot')
+    offset = HEADER.size
+
+    state = RNG_STATE.unpack_from(view, offset)
+    offset += RNG_STATE.size
+
+    (size,) = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    level_path = bytes(view[offset:offset + size]).decode() or None
+    offset += size
+
+    (count,) = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    input_ticks = array('I')
+    input_ticks.frombytes(view[offset:offset + count * input_ticks.itemsize])
+    offset += count * input_ticks.itemsize
+    input_codes = view[offset:offset + count]
+    offset += count
+
+    typecode = chr(view[offset])
+    (count,) = COUNT.unpack_from(view, offset + 1)
+    offset += 1 + COUNT.size
+    body = array(typecode)
+    body.frombytes(view[offset:offset + count * body.itemsize])
+    offset += count * body.itemsize
+
+    (size,) = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    occupied = bytearray(zlib.decompress(view[offset:offset + size]))
+
+    if level is None:
+        level = load_level(level_path)
+    elif level.path != level_path:
+        raise ValueError(f'the snapshot is for {level_path or "the plain board"}, not {level.path or "the plain board"}')
+    if (level.width, level.height) != (width, height) or len(occupied) != width * height:
+        raise ValueError(f'the snapshot is for a {width}x{height} board, the level is {level.width}x{level.height}')
+    if max(direction, moved_direction) > 3 or not body or len(body) > length or max(body) >= width * height:
+        raise ValueError('the snapshot holds an invalid snake')
+
+    engine = SnakeEngine(seed, level)
+    engine.rng = Random()
+    engine.rng.setstate((version, state, gauss if has_gauss else None))
+    engine.ticks = ticks
+    engine.direction = direction
+    engine.moved_direction = moved_direction
+    engine.apple = None if apple == -1 else apple
+    engine.snake_body_length = length
+    engine.inputs = list(zip(input_ticks, map(DIRECTION_NAMES.__getitem__, input_codes)))
+
+    engine.body_positions = LimitedList(length, body)
+    engine.head = body[-1]
+    engine.occupied = occupied
+    return engine, elapsed
+
+
+def save_game(path, engine, elapsed=0.0):
+    """
+    Save a running game to a file.
+
+    The snapshot is written to a temporary file first, so an interrupted save never
+    leaves a broken file behind.
+
+    Args:
+        path (str): The path of the file.
+        engine (SnakeEngine): The game.
+        elapsed (float, optional): How long the game has been played, in seconds.
+    """
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(dump_snapshot(engine, elapsed))
+    os.replace(temporary, path)
+
+
+def load_game(path, level=None, remove=True):
+    """
+    Load a saved game, if there is one.
+
+    Args:
+        path (str): The path of the file.
+        level (Level, optional): The level to continue the game on, see `load_snapshot`.
+        remove (bool, optional): Delete the file once it is loaded, so a game is only
+                                 resumed once. A file that cannot be loaded is kept.
+
+    Returns:
+        tuple: The engine and the number of seconds the game had been played, or None
+               if there is no saved game.
+
+    Raises:
+        ValueError: If the file is broken or does not match the level.
+        OSError: If the file cannot be read.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as file:
+        data = file.read()
+    try:
+        saved = load_snapshot(data, level)
+    except (struct.error, zlib.error, IndexError) as error:
+        raise ValueError(f'{path} is not a valid snapshot') from error
+    if remove:
+        os.remove(path)
+    return saved
+
+
+def discard_game(path):
+    """
+    Delete a saved game, if there is one.
+
+    Args:
+        path (str): The path of the file.
+    """
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,197 @@
+from math import ceil
+from time import perf_counter
+
+from settings import *
+
+
+def linear_curve(base_interval, apples):
+    """
+    Shorten the interval by a fixed number of milliseconds per apple.
+
+    This is the original behaviour of the game (250 ms, minus 5 ms per apple).
+
+    Args:
+        base_interval (int): The interval at the start of the game in milliseconds.
+        apples (int): The number of apples eaten so far.
+
+    Returns:
+        float: The target interval in milliseconds.
+    """
+    return base_interval - SPEED_STEP * apples
+
+
+def exponential_curve(base_interval, apples):
+    """
+    Shorten the interval by a fixed percentage per apple.
+
+    The game speeds up quickly at the start and flattens out as the snake grows.
+
+    Args:
+        base_interval (int): The interval at the start of the game in milliseconds.
+        apples (int): The number of apples eaten so far.
+
+    Returns:
+        float: The target interval in milliseconds.
+    """
+    return base_interval * SPEED_FACTOR ** apples
+
+
+def stepped_curve(base_interval, apples):
+    """
+    Shorten the interval in larger steps every few apples.
+
+    Args:
+        base_interval (int): The interval at the start of the game in milliseconds.
+        apples (int): The number of apples eaten so far.
+
+    Returns:
+        float: The target interval in milliseconds.
+    """
+    return base_interval - SPEED_STEP * SPEED_STEP_EVERY * (apples // SPEED_STEP_EVERY)
+
+
+# The available difficulty curves, selectable by name through SPEED_CURVE
+CURVES = {'linear': linear_curve, 'exponential': exponential_curve, 'stepped': stepped_curve}
+
+
+class SpeedScheduler:
+    """
+    A class deciding how often the snake moves.
+
+    The scheduler turns the number of eaten apples into a movement interval using a
+    pluggable difficulty curve, and never goes below a configured minimum interval.
+    It also measures how long a tick actually takes: the time spent in the tick handler,
+    plus the time the next tick fired late because the event loop was still busy, mostly
+    drawing the last one. When the target interval is shorter than what the current render
+    mode can sustain, it first turns off rendering effects (through the `on_degrade`
+    callback) and otherwise keeps the interval at the shortest sustainable value instead
+    of letting the frame rate collapse. The sustainable value is capped at `max_interval`,
+    so timer jitter or a single stall cannot slow the game down without limit.
+
+    Attributes:
+        curve (callable): The difficulty curve, mapping (base interval, apples) to an interval.
+        base_interval (int): The interval at the start of the game in milliseconds.
+        min_interval (int): The shortest interval the scheduler will ever return.
+        max_interval (int): The longest interval the measured tick cost can force.
+        apples (int): The number of apples eaten so far.
+        tick_cost (float): Smoothed cost of a single tick in milliseconds.
+        effects_enabled (bool): Whether the frontend should still draw rendering effects.
+        interval (int): The interval the frontend should currently use.
+    """
+
+    def __init__(self, curve=SPEED_CURVE, base_interval=REFRESH_SPEED, min_interval=MIN_REFRESH_SPEED,
+                 on_degrade=None, apples=0, max_interval=MAX_REFRESH_SPEED):
+        """
+        Initialize the scheduler.
+
+        Args:
+            curve (str | callable): A name from CURVES or a custom curve function.
+            base_interval (int): The interval at the start of the game in milliseconds.
+            min_interval (int): The shortest allowed interval in milliseconds.
+            on_degrade (callable, optional): Called once, without arguments, when the
+                                             frontend should turn off rendering effects.
+            apples (int, optional): The number of apples already eaten, for a resumed game.
+            max_interval (int, optional): The longest interval the measured tick cost can force.
+        """
+        self.curve = CURVES[curve] if isinstance(curve, str) else curve
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.on_degrade = on_degrade
+
+        self.apples = apples
+        self.tick_cost = 0.0
+        self.effects_enabled = True
+        self.interval = self.target_interval
+        self._tick_start = None
+        self._scheduled_at = None
+        self._lateness = 0.0
+
+    @property
+    def target_interval(self):
+        """
+        Get the interval requested by the difficulty curve, limited by the minimum interval.
+
+        Returns:
+            int: The target interval in milliseconds.
+        """
+        return max(self.min_interval, int(self.curve(self.base_interval, self.apples)))
+
+    @property
+    def sustainable_interval(self):
+        """
+        Get the shortest interval the measured tick cost leaves enough headroom for, at
+        most `max_interval`.
+
+        Returns:
+            int: The sustainable interval in milliseconds.
+        """
+        return min(ceil(self.tick_cost * FRAME_HEADROOM), self.max_interval)
+
+    def apple_eaten(self):
+        """
+        Move one step along the difficulty curve.
+
+        Returns:
+            int: The new interval in milliseconds.
+        """
+        self.apples += 1
+        return self.update_interval()
+
+    def begin_tick(self):
+        """
+        Mark the start of a tick, so its cost can be measured.
+
+        If the tick fires later than the interval it was scheduled with, the event loop was
+        busy (mostly drawing the previous tick) for the time it is late, which is added to
+        the cost of the tick. The interval itself was idle and does not count.
+        """
+        now = perf_counter()
+        self._lateness = 0.0
+        if self._scheduled_at is not None:
+            lateness = (now - self._scheduled_at) * 1000 - self.interval
+            if lateness > TICK_LATENESS_TOLERANCE:
+                self._lateness = lateness
+        self._tick_start = now
+
+    def pause(self):
+        """
+        Forget when the next tick was scheduled, so a pause is not mistaken for a late tick.
+        """
+        self._scheduled_at = None
+
+    def end_tick(self):
+        """
+        Mark the end of a tick and fold its cost into the smoothed tick cost.
+
+        The frontend must schedule the next tick right after this, with the returned interval.
+
+        Returns:
+            int: The interval the frontend should use for the next tick.
+        """
+        if self._tick_start is not None:
+            cost = (perf_counter() - self._tick_start) * 1000 + self._lateness
+            self._tick_start = None
+            # Exponential moving average, so a single slow frame does not slow the game down
+            self.tick_cost += (cost - self.tick_cost) * TICK_COST_SMOOTHING
+        interval = self.update_interval()
+        self._scheduled_at = perf_counter()
+        return interval
+
+    def update_interval(self):
+        """
+        Recalculate the interval from the curve and the measured tick cost.
+
+        If the target interval is below what the frontend can sustain, rendering effects
+        are turned off first. The interval never goes below the sustainable value.
+
+        Returns:
+            int: The interval the frontend should use for the next tick.
+        """
+        target = self.target_interval
+        if target < self.sustainable_interval and self.effects_enabled:
+            self.effects_enabled = False
+            if self.on_degrade is not None:
+                self.on_degrade()
+        self.interval = max(target, self.sustainable_interval)
+        return self.interval
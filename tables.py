@@ -0,0 +1,164 @@
+from array import array
+from functools import lru_cache
+
+from settings import *
+
+# Integer direction codes, in clockwise order, so the opposite direction is two steps away
+UP, RIGHT, DOWN, LEFT = range(4)
+DIRECTION_CODES = {'up': UP, 'right': RIGHT, 'down': DOWN, 'left': LEFT}
+DIRECTION_NAMES = ('up', 'right', 'down', 'left')
+OPPOSITE = (DOWN, LEFT, UP, RIGHT)
+
+# Marks a move that ends in a wall or off the board in the neighbour table
+WALL = -1
+
+
+class BoardTables:
+    """
+    A class holding lookup tables for a level, so a tick needs no arithmetic on coordinates.
+
+    Cells are identified by their flat index `row * width + column`. The neighbour table
+    holds, for every cell and direction code, the index of the cell the head moves to,
+    with wraparound and portals already applied, or WALL when the move hits a wall or
+    leaves the board. The tables are built once per level and cached.
+
+    Attributes:
+        level (Level): The level the tables were built for.
+        width (int): The number of columns.
+        cells (int): The number of cells.
+        neighbours (array): The destination of a move, indexed by `cell * 4 + direction`.
+        distances (dict): The cached results of `distances_to`, least recently used first.
+    """
+
+    def __init__(self, level):
+        """
+        Build the tables for a level.
+
+        Args:
+            level (Level): The level to build the tables for.
+        """
+        self.level = level
+        self.width = level.width
+        self.cells = level.width * level.height
+        self.distances = {}
+
+        deltas = [(-1, 0), (0, 1), (1, 0), (0, -1)]  # (row, column) change per direction code
+        neighbours = array('i', [WALL]) * (self.cells * 4)
+        for cell in range(self.cells):
+            row, column = divmod(cell, level.width)
+            for code, (delta_row, delta_column) in enumerate(deltas):
+                next_row = row + delta_row
+                next_column = column + delta_column
+                if level.wrap:
+                    next_row %= level.height
+                    next_column %= level.width
+                elif not (0 <= next_row < level.height and 0 <= next_column < level.width):
+                    continue
+
+                target = next_row * level.width + next_column
+                if target in level.portals:
+                    portal_row, portal_column = level.portals[target]
+                    target = portal_row * level.width + portal_column
+                if not level.walls[target]:
+                    neighbours[cell * 4 + code] = target
+        self.neighbours = neighbours
+
+    def cell(self, row, column):
+        """
+        Get the flat index of a cell.
+
+        Args:
+            row (int): The row of the cell.
+            column (int): The column of the cell.
+
+        Returns:
+            int: The index of the cell.
+        """
+        return row * self.width + column
+
+    def position(self, cell):
+        """
+        Get the row and the column of a cell.
+
+        Args:
+            cell (int): The index of the cell.
+
+        Returns:
+            tuple: The (row, column) pair.
+        """
+        return divmod(cell, self.width)
+
+
+@lru_cache(maxsize=LEVEL_CACHE_SIZE)
+def board_tables(level):
+    """
+    Get the lookup tables for a level, building them on first use.
+
+    Levels are cached by `load_level`, so every game on the same level shares its tables.
+
+    Args:
+        level (Level): The level.
+
+    Returns:
+        BoardTables: The tables of the level.
+    """
+    return BoardTables(level)
+
+
+@lru_cache(maxsize=LEVEL_CACHE_SIZE)
+def reverse_neighbours(tables):
+    """
+    Get, for every cell, the cells a single move leads from into it.
+
+    Args:
+        tables (BoardTables): The lookup tables of a level.
+
+    Returns:
+        list: A list of source cells per cell.
+    """
+    sources = [[] for _ in range(tables.cells)]
+    for index, target in enumerate(tables.neighbours):
+        if target != WALL:
+            sources[target].append(index // 4)
+    return sources
+
+
+def distances_to(tables, cell):
+    """
+    Get the length of the shortest path from every cell to a cell.
+
+    The paths follow the walls, wraparound and portals of the level but ignore the snake,
+    so they are a lower bound for the moves the snake needs. Distances are cached per
+    target cell, since the same apple cells come up in game after game. The cache of a
+    level holds at most DISTANCE_CACHE_SIZE cells of distances, so small boards keep every
+    target and large boards only the recently used ones.
+
+    Args:
+        tables (BoardTables): The lookup tables of a level.
+        cell (int): The target cell.
+
+    Returns:
+        array: The number of moves per source cell, -1 where the cell cannot be reached.
+    """
+    cache = tables.distances
+    distances = cache.pop(cell, None)
+    if distances is None:
+        sources = reverse_neighbours(tables)
+        distances = array('i', [-1]) * tables.cells
+        distances[cell] = 0
+        frontier = [cell]
+        distance = 0
+        while frontier:
+            distance += 1
+            next_frontier = []
+            for current in frontier:
+                for source in sources[current]:
+                    if distances[source] == -1:
+                        distances[source] = distance
+                        next_frontier.append(source)
+            frontier = next_frontier
+        if len(cache) >= max(1, DISTANCE_CACHE_SIZE // tables.cells):
+            del cache[next(iter(cache))]
+    # Reinserted, so the dictionary stays ordered from the least to the most recently used
+    cache[cell] = distances
+    return distances
@@ -0,0 +1,245 @@
+import argparse
+import sys
+from time import perf_counter, sleep
+
+from controllers import Autopilot
+from engine import SnakeEngine
+from level import load_level
+from replay import Replay, iter_replays, save_replay
+from settings import *
+
+
+def ansi_color(color: str) -> str:
+    """
+    Convert a '#RRGGBB' color into an ANSI true color background escape sequence.
+
+    Args:
+        color (str): The color in hex notation.
+
+    Returns:
+        str: The escape sequence.
+    """
+    red, green, blue = (int(color[index:index + 2], 16) for index in (1, 3, 5))
+    return f'\x1b[48;2;{red};{green};{blue}m'
+
+
+class TerminalRenderer:
+    """
+    A class drawing a game on an ANSI terminal.
+
+    The board is drawn once when a game starts. After that only the cells that changed on
+    a tick (the new head, the old head, the cell the tail left and the apple) are redrawn,
+    using cursor positioning, and every tick is written to the stream in a single call.
+    Each cell is two characters wide, so the board keeps its proportions.
+    """
+    CELL = '  '
+    RESET = '\x1b[0m'
+
+    def __init__(self, stream=sys.stdout):
+        """
+        Initialize the renderer.
+
+        Args:
+            stream: The text stream to draw on.
+        """
+        self.stream = stream
+        self.colors = {'body': ansi_color(SNAKE_BODY_COLOR),
+                       'head': ansi_color(SNAKE_HEAD_COLOR),
+                       'apple': ansi_color(APPLE_COLOR),
+                       'wall': ansi_color(WALL_COLOR),
+                       'portal': ansi_color(PORTAL_COLOR),
+                       'empty': ansi_color(TERMINAL_BACKGROUND_COLOR)}
+        self.height = 0
+
+    def cell(self, row, column, kind):
+        """
+        Get the escape sequence drawing a single cell.
+
+        The board starts on the second row and column of the terminal, inside a border.
+
+        Args:
+            row (int): The row of the cell.
+            column (int): The column of the cell.
+            kind (str): One of 'body', 'head', 'apple', 'wall', 'portal' or 'empty'.
+
+        Returns:
+            str: The escape sequence.
+        """
+        return f'\x1b[{row + 2};{column * 2 + 3}H{self.colors[kind]}{self.CELL}'
+
+    def draw_board(self, engine):
+        """
+        Clear the terminal and draw the whole board, including the walls and portals
+        of the level.
+
+        Args:
+            engine (SnakeEngine): The game to draw.
+        """
+        level = engine.level
+        self.height = level.height
+        width = level.width * 2
+        parts = ['\x1b[?25l\x1b[2J\x1b[H', '+' + '-' * width + '+\n']
+        for _ in range(level.height):
+            parts.append('|' + self.colors['empty'] + ' ' * width + self.RESET + '|\n')
+        parts.append('+' + '-' * width + '+')
+        for kind in ('wall', 'portal'):
+            for row, column in level.cells(kind):
+                parts.append(self.cell(row, column, kind))
+        for row, column in engine.positions():
+            parts.append(self.cell(row, column, 'body'))
+        parts.append(self.cell(engine.row, engine.column, 'head'))
+        if engine.apple_row is not None:
+            parts.append(self.cell(engine.apple_row, engine.apple_column, 'apple'))
+        parts.append(self.status(engine))
+        self.stream.write(''.join(parts))
+        self.stream.flush()
+
+    def draw_tick(self, engine, old_row, old_column):
+        """
+        Redraw the cells that changed on the last tick.
+
+        Args:
+            engine (SnakeEngine): The game to draw.
+            old_row (int): The row of the head before the tick.
+            old_column (int): The column of the head before the tick.
+        """
+        parts = []
+        if engine.vacated is not None:
+            # The snake leaves a portal when it came out of one
+            kind = 'portal' if engine.vacated in engine.level.portals else 'empty'
+            parts.append(self.cell(*engine.tables.position(engine.vacated), kind))
+        if engine.alive:
+            parts.append(self.cell(old_row, old_column, 'body'))
+            parts.append(self.cell(engine.row, engine.column, 'head'))
+        if engine.ate_apple and engine.apple_row is not None:
+            parts.append(self.cell(engine.apple_row, engine.apple_column, 'apple'))
+            parts.append(self.status(engine))
+        self.stream.write(''.join(parts))
+        self.stream.flush()
+
+    def status(self, engine):
+        """
+        Get the escape sequence drawing the score below the board.
+
+        Args:
+            engine (SnakeEngine): The game to draw.
+
+        Returns:
+            str: The escape sequence.
+        """
+        return f'{self.RESET}\x1b[{self.height + 3};1H\x1b[2Kscore = {engine.score}'
+
+    def close(self):
+        """
+        Move the cursor below the board and show it again.
+        """
+        self.stream.write(f'{self.RESET}\x1b[{self.height + 4};1H\x1b[?25h')
+        self.stream.flush()
+
+
+def play_game(engine, controller, renderer=None, ticks_per_second=0, max_ticks=None):
+    """
+    Play a single game until the snake dies.
+
+    Args:
+        engine (SnakeEngine): The game to play.
+        controller: An object with an `act(engine)` method steering the snake.
+        renderer (TerminalRenderer, optional): Draws the game, nothing is drawn if omitted.
+        ticks_per_second (int, optional): The pace of the game, 0 runs as fast as possible.
+        max_ticks (int, optional): Stop after this many ticks even if the game goes on.
+
+    Returns:
+        int: The number of ticks played.
+    """
+    interval = 1 / ticks_per_second if ticks_per_second else 0
+    if renderer is not None:
+        renderer.draw_board(engine)
+
+    next_tick = perf_counter()
+    while engine.alive and (max_ticks is None or engine.ticks < max_ticks):
+        controller.act(engine)
+        old_row, old_column = engine.row, engine.column
+        engine.step()
+        if renderer is not None:
+            renderer.draw_tick(engine, old_row, old_column)
+
+        if interval:
+            next_tick += interval
+            delay = next_tick - perf_counter()
+            if delay > 0:
+                sleep(delay)
+    return engine.ticks
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Play Snake in a terminal, without a display.')
+    parser.add_argument('--replay', metavar='ARCHIVE',
+                        help='play the games of a replay archive instead of the autopilot')
+    parser.add_argument('--games', type=int, default=1,
+                        help='the number of autopilot games to play, 0 plays until interrupted')
+    parser.add_argument('--seed', type=int, help='the seed of the first autopilot game')
+    parser.add_argument('--level', default=LEVEL, help='the level file to play the autopilot games on')
+    parser.add_argument('--tps', type=int, default=TERMINAL_TICKS_PER_SECOND,
+                        help='ticks per second, 0 runs as fast as possible')
+    parser.add_argument('--max-ticks', type=int,
+                        help=f'end every game after this many ticks, {TERMINAL_MAX_TICKS} for autopilot games by default')
+    parser.add_argument('--no-render', action='store_true', help='do not draw anything, only report')
+    parser.add_argument('--record', metavar='ARCHIVE', help='append the played games to a replay archive')
+    return parser.parse_args()
+
+
+def games(arguments):
+    """
+    Create the games to play from the command line arguments.
+
+    Args:
+        arguments (argparse.Namespace): The parsed command line arguments.
+
+    Yields:
+        tuple: An engine, the controller steering it and the number of ticks to play at most.
+    """
+    if arguments.replay:
+        for replay in iter_replays(arguments.replay):
+            # A replay stops where the recorded game was stopped, not where the snake dies
+            max_ticks = replay.ticks
+            if arguments.max_ticks is not None:
+                max_ticks = arguments.max_ticks if max_ticks is None else min(max_ticks, arguments.max_ticks)
+            yield *replay.start(), max_ticks
+        return
+
+    level = load_level(arguments.level)
+    seed = arguments.seed
+    played = 0
+    while not arguments.games or played < arguments.games:
+        engine = SnakeEngine(seed, level)
+        seed = engine.seed + 1
+        played += 1
+        yield engine, Autopilot(), arguments.max_ticks or TERMINAL_MAX_TICKS
+
+
+def main():
+    arguments = parse_arguments()
+    renderer = None if arguments.no_render else TerminalRenderer()
+
+    total_ticks = 0
+    total_games = 0
+    start = perf_counter()
+    try:
+        for engine, controller, max_ticks in games(arguments):
+            total_ticks += play_game(engine, controller, renderer, arguments.tps, max_ticks)
+            total_games += 1
+            if arguments.record:
+                save_replay(arguments.record, Replay.from_engine(engine, controller.name))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if renderer is not None:
+            renderer.close()
+
+    elapsed = perf_counter() - start
+    print(f'{total_games} games, {total_ticks} ticks in {elapsed:.2f} s '
+          f'({total_ticks / elapsed if elapsed else 0:.0f} ticks per second)', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+import pytest
+
+from diagnostics import restart_residency, segment_bytes, widget_restarts
+from settings import *
+
+
+def test_body_segment_budget():
+    per_segment, _ = segment_bytes()
+    assert per_segment <= DIAGNOSTICS_SEGMENT_BUDGET
+
+
+def test_restart_residency_budget():
+    assert restart_residency() <= DIAGNOSTICS_RESTART_BUDGET
+
+
+def test_pyside_restarts_leave_no_widgets_behind():
+    try:
+        counts = widget_restarts()
+    except ImportError as error:  # PySide6, or hPyT outside Windows
+        pytest.skip(f'PySide6 frontend not available: {error}')
+    assert counts == [0] * DIAGNOSTICS_WIDGET_RESTARTS
@@ -0,0 +1,71 @@
+import math
+
+import pytest
+
+from engine import SnakeEngine
+from level import Level, load_level
+from snapshot import dump_snapshot, load_game, load_snapshot, save_game
+from tables import DOWN, RIGHT
+
+LENGTH = 10_000
+
+
+def long_game(length=LENGTH):
+    """
+    Grow a snake to a length on a board with wraparound, then place an apple.
+    """
+    side = math.isqrt(length) + 3
+    engine = SnakeEngine(seed=7, level=Level('snapshot', side, side, wrap=True))
+    engine.grow_along_rows(length)
+    engine.randomize_apple_position()
+    return engine
+
+
+def assert_same_game(engine, loaded):
+    assert list(loaded.body_positions) == list(engine.body_positions)
+    assert loaded.body_positions.max_size == engine.body_positions.max_size
+    assert loaded.occupied == engine.occupied
+    assert loaded.head == engine.head
+    assert loaded.apple == engine.apple
+    assert loaded.snake_body_length == engine.snake_body_length
+    assert (loaded.direction, loaded.moved_direction) == (engine.direction, engine.moved_direction)
+    assert loaded.ticks == engine.ticks
+    assert loaded.inputs == engine.inputs
+    assert loaded.rng.getstate() == engine.rng.getstate()
+
+
+def test_round_trip_of_a_long_snake():
+    engine = long_game()
+    loaded, elapsed = load_snapshot(dump_snapshot(engine, 12.5), engine.level)
+    assert elapsed == 12.5
+    assert_same_game(engine, loaded)
+
+    # Both games go on the same way, apples included
+    for _ in range(500):
+        engine.turn(DOWN if engine.ticks % 7 == 0 else RIGHT)
+        loaded.turn(DOWN if loaded.ticks % 7 == 0 else RIGHT)
+        assert engine.step() == loaded.step()
+    assert_same_game(engine, loaded)
+
+
+def test_load_game_keeps_a_save_from_another_level(tmp_path):
+    path = tmp_path / 'savegame.snk'
+    engine = SnakeEngine(seed=1, level=load_level('box.txt'))
+    engine.step()
+    save_game(path, engine)
+
+    with pytest.raises(ValueError):
+        load_game(path, load_level(None))
+    assert path.exists()
+
+    loaded, _ = load_game(path, engine.level)
+    assert_same_game(engine, loaded)
+    assert not path.exists()
+
+
+def test_load_game_rejects_a_broken_file(tmp_path):
+    path = tmp_path / 'savegame.snk'
+    path.write_bytes(b'SNK1 broken')
+    with pytest.raises(ValueError):
+        load_game(path)
+    assert path.exists()
@@ -0,0 +1,313 @@
+import argparse
+import importlib
+import json
+import math
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from random import Random
+from time import perf_counter, perf_counter_ns
+
+from controllers import CONTROLLERS
+from engine import SnakeEngine
+from level import load_level
+from settings import *
+
+
+class TournamentEngine(SnakeEngine):
+    """
+    An engine giving every controller the same apples.
+
+    The plain engine draws all apples from one random number generator, and draws again
+    when a position is taken, so the apples of a game depend on where the snake went.
+    Here the n-th apple of a game comes from its own generator, seeded from the seed of
+    the game and n, so controllers playing the same seed get the same apple sequence
+    (an apple only moves if its cell is inside the snake).
+    """
+
+    def randomize_apple_position(self):
+        self.rng = Random(self.seed * 2 ** 32 + self.snake_body_length)
+        super().randomize_apple_position()
+
+
+def load_controller(name):
+    """
+    Get a controller class by name.
+
+    Args:
+        name (str): A name from CONTROLLERS, or 'module:Class' for a controller defined
+                    elsewhere, which must have an `act(engine)` method.
+
+    Returns:
+        type: The controller class.
+    """
+    if name in CONTROLLERS:
+        return CONTROLLERS[name]
+    module, _, attribute = name.partition(':')
+    if not attribute:
+        raise ValueError(f'unknown controller {name!r}, use one of {", ".join(CONTROLLERS)} or module:Class')
+    return getattr(importlib.import_module(module), attribute)
+
+
+def histogram_bucket(value):
+    """
+    Get the histogram bucket of a value.
+
+    The buckets are log-linear: every power of two is split into equal parts, so a value
+    only loses the bits below its TOURNAMENT_HISTOGRAM_BITS most significant ones. The
+    histogram stays small while percentiles are within 1/16 of the real value.
+
+    Args:
+        value (int): A value, zero or more.
+
+    Returns:
+        int: The smallest value of the bucket.
+    """
+    shift = max(0, value.bit_length() - TOURNAMENT_HISTOGRAM_BITS)
+    return value >> shift << shift
+
+
+def play_batch(controller, level, first_seed, count, max_ticks):
+    """
+    Play a batch of games with one controller. This runs in the worker processes.
+
+    Args:
+        controller (str): The name of the controller, see `load_controller`.
+        level (str): The level path, None for the plain board.
+        first_seed (int): The seed of the first game, the others follow it.
+        count (int): The number of games.
+        max_ticks (int): End every game after this many ticks.
+
+    Returns:
+        list: A (seed, score, ticks, death cause, decision times) tuple per game. The decision
+              times are the total and the maximum in nanoseconds, and the number of decisions
+              per histogram bucket, see `histogram_bucket`.
+    """
+    controller_class = load_controller(controller)
+    level = load_level(level)
+    results = []
+    for seed in range(first_seed, first_seed + count):
+        engine = TournamentEngine(seed, level)
+        player = controller_class()
+        total = longest = 0
+        histogram = Counter()
+        while engine.alive and engine.ticks < max_ticks:
+            start = perf_counter_ns()
+            player.act(engine)
+            elapsed = perf_counter_ns() - start
+            total += elapsed
+            longest = max(longest, elapsed)
+            histogram[histogram_bucket(elapsed)] += 1
+            engine.step()
+        results.append((seed, engine.score, engine.ticks, engine.death_cause, (total, longest, histogram)))
+    return results
+
+
+def mean_interval(values):
+    """
+    Get the mean of a sample with its 95% confidence interval, from the normal approximation.
+
+    Args:
+        values (list): The sample.
+
+    Returns:
+        tuple: The mean and the half width of the interval.
+    """
+    count = len(values)
+    mean = sum(values) / count
+    if count < 2:
+        return mean, math.inf
+    variance = sum((value - mean) ** 2 for value in values) / (count - 1)
+    return mean, 1.96 * math.sqrt(variance / count)
+
+
+def histogram_percentile(histogram, fraction):
+    """
+    Get a percentile from a histogram of `histogram_bucket` buckets.
+
+    Args:
+        histogram (Counter): The number of values per bucket.
+        fraction (float): The percentile, between 0 and 1.
+
+    Returns:
+        int: The largest value of the bucket the percentile falls in.
+    """
+    target = fraction * sum(histogram.values())
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= target:
+            return bucket + (1 << max(0, bucket.bit_length() - TOURNAMENT_HISTOGRAM_BITS)) - 1
+    return 0
+
+
+class Standings:
+    """
+    A class collecting the results of one controller.
+
+    Attributes:
+        name (str): The name of the controller.
+        scores (dict): The score per seed.
+        ticks (dict): The number of ticks survived per seed.
+        death_causes (Counter): The number of games per death cause, 'none' for games
+                                that reached the tick limit.
+        decision_ns (int): The total time spent deciding, in nanoseconds.
+        longest_decision_ns (int): The longest decision, in nanoseconds.
+        decisions (Counter): The number of decisions per histogram bucket of nanoseconds.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.scores = {}
+        self.ticks = {}
+        self.death_causes = Counter()
+        self.decision_ns = 0
+        self.longest_decision_ns = 0
+        self.decisions = Counter()
+
+    def add(self, results):
+        """
+        Add the results of a batch, as returned by `play_batch`.
+        """
+        for seed, score, ticks, death_cause, (total, longest, histogram) in results:
+            self.scores[seed] = score
+            self.ticks[seed] = ticks
+            self.death_causes[death_cause or 'none'] += 1
+            self.decision_ns += total
+            self.longest_decision_ns = max(self.longest_decision_ns, longest)
+            self.decisions.update(histogram)
+
+    def summary(self, baseline=None):
+        """
+        Summarise the results.
+
+        Args:
+            baseline (Standings, optional): The controller to compare the scores with, game
+                                            by game on the same seeds.
+
+        Returns:
+            dict: The statistics.
+        """
+        seeds = sorted(self.scores)
+        games = len(seeds)
+        score, score_interval = mean_interval([self.scores[seed] for seed in seeds])
+        ticks, ticks_interval = mean_interval([self.ticks[seed] for seed in seeds])
+        moves = sum(self.decisions.values())
+        summary = {
+            'controller': self.name,
+            'games': games,
+            'score': score,
+            'score_ci95': score_interval,
+            'ticks': ticks,
+            'ticks_ci95': ticks_interval,
+            'survived': self.death_causes['none'] / games,
+            'death_causes': dict(self.death_causes),
+            'decision_us_mean': self.decision_ns / moves / 1000 if moves else 0.0,
+            'decision_us_p99': histogram_percentile(self.decisions, 0.99) / 1000,
+            'decision_us_max': self.longest_decision_ns / 1000,
+        }
+        if baseline is not None and baseline is not self:
+            # Both played the same seeds with the same apples, so the games can be paired
+            difference, interval = mean_interval([self.scores[seed] - baseline.scores[seed] for seed in seeds])
+            summary['score_vs_leader'] = difference
+            summary['score_vs_leader_ci95'] = interval
+        return summary
+
+
+def run_tournament(controllers, games, level=None, seed=0, max_ticks=TOURNAMENT_MAX_TICKS, workers=None,
+                   batch_size=TOURNAMENT_BATCH_SIZE):
+    """
+    Play the same seeded games with every controller, on a pool of worker processes.
+
+    Args:
+        controllers (list): The names of the controllers, see `load_controller`.
+        games (int): The number of games per controller.
+        level (str, optional): The level path, None for the plain board.
+        seed (int, optional): The seed of the first game.
+        max_ticks (int, optional): End every game after this many ticks.
+        workers (int, optional): The number of worker processes, by default one per core.
+        batch_size (int, optional): The number of games handed to a worker at once.
+
+    Returns:
+        list: The summaries of the controllers, best first.
+    """
+    for name in controllers:
+        load_controller(name)  # Unknown names fail here, not in the workers
+    standings = {name: Standings(name) for name in controllers}
+    with ProcessPoolExecutor(workers or os.cpu_count() or 1) as executor:
+        futures = {}
+        for first_seed in range(seed, seed + games, batch_size):
+            count = min(batch_size, seed + games - first_seed)
+            for name in controllers:
+                futures[executor.submit(play_batch, name, level, first_seed, count, max_ticks)] = name
+        for future in as_completed(futures):
+            standings[futures[future]].add(future.result())
+
+    ranked = sorted(standings.values(), key=lambda standing: standing.summary()['score'], reverse=True)
+    return [standing.summary(baseline=ranked[0]) for standing in ranked]
+
+
+def format_report(summaries):
+    """
+    Format the summaries as a ranked table.
+
+    Args:
+        summaries (list): The summaries, best first, as returned by `run_tournament`.
+
+    Returns:
+        str: The report.
+    """
+    width = max(len('controller'), *(len(summary['controller']) for summary in summaries)) + 2
+    lines = [f'{"rank":<5}{"controller":<{width}}{"score (95% CI)":<20}{"vs leader":<18}{"ticks (95% CI)":<22}'
+             f'{"survived":>9}{"decision us mean/p99/max":>28}  deaths']
+    for rank, summary in enumerate(summaries, start=1):
+        score = f'{summary["score"]:.2f} ± {summary["score_ci95"]:.2f}'
+        if 'score_vs_leader' in summary:
+            leader = f'{summary["score_vs_leader"]:+.2f} ± {summary["score_vs_leader_ci95"]:.2f}'
+        else:
+            leader = '-'
+        ticks = f'{summary["ticks"]:.0f} ± {summary["ticks_ci95"]:.0f}'
+        decisions = (f'{summary["decision_us_mean"]:.1f} / {summary["decision_us_p99"]:.1f} / '
+                     f'{summary["decision_us_max"]:.0f}')
+        deaths = ', '.join(f'{cause} {count}' for cause, count in sorted(summary['death_causes'].items()))
+        lines.append(f'{rank:<5}{summary["controller"]:<{width}}{score:<20}{leader:<18}{ticks:<22}'
+                     f'{summary["survived"]:>9.1%}{decisions:>28}  {deaths}')
+    return '\n'.join(lines)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Compare controllers on the same seeded games.')
+    parser.add_argument('controllers', nargs='*', default=sorted(CONTROLLERS), metavar='CONTROLLER',
+                        help=f'{", ".join(CONTROLLERS)} or module:Class, all built in controllers by default')
+    parser.add_argument('--games', type=int, default=1000, help='the number of games per controller')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the first game')
+    parser.add_argument('--level', default=LEVEL, help='the level file to play on')
+    parser.add_argument('--max-ticks', type=int, default=TOURNAMENT_MAX_TICKS, help='end every game after this many ticks')
+    parser.add_argument('--workers', type=int, help='the number of worker processes, one per core by default')
+    parser.add_argument('--json', metavar='FILE', help='also write the summaries as JSON')
+    arguments = parser.parse_args()
+    if arguments.games < 1:
+        parser.error('--games must be at least 1')
+    return arguments
+
+
+def main():
+    arguments = parse_arguments()
+    start = perf_counter()
+    try:
+        summaries = run_tournament(arguments.controllers, arguments.games, arguments.level, arguments.seed,
+                                   arguments.max_ticks, arguments.workers)
+    except (ValueError, ImportError, AttributeError) as error:
+        sys.exit(f'tournament.py: {error}')
+    elapsed = perf_counter() - start
+
+    print(format_report(summaries))
+    if arguments.json:
+        with open(arguments.json, 'w', encoding='utf-8') as file:
+            json.dump(summaries, file, indent=2)
+    print(f'{arguments.games * len(arguments.controllers)} games in {elapsed:.2f} s', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
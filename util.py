@@ -8,6 +8,9 @@ class LimitedList:
     This class implements a list-like data structure that maintains a maximum size.
     When the maximum size is reached, adding new items removes the oldest items.
 
+    The deque has no maximum length of its own, the oldest item is removed in `add`,
+    so changing the maximum size never has to copy the items into a new deque.
+
     Attributes:
         _max_size (int): The maximum number of items the list can hold.
         items (deque): A double-ended queue to store the items.
@@ -17,15 +20,19 @@ class LimitedList:
         __getitem__(index): Allows indexing and slicing of the list.
         __iter__(): Makes the class iterable.
     """
-    def __init__(self, max_size):
+    def __init__(self, max_size, items=()):
         """
         Initialize the LimitedList with a maximum size.
 
         Args:
             max_size (int): The maximum number of items the list can hold.
+            items (iterable, optional): Initial items, oldest first. If there are more
+                                        than max_size, only the newest are kept.
         """
         self._max_size = max_size
-        self.items = deque(maxlen=max_size)
+        self.items = deque(items)
+        while len(self.items) > max_size:
+            self.items.popleft()
 
     @property
     def max_size(self):
@@ -48,12 +55,10 @@ class LimitedList:
         Args:
             new_max_size (int): The new maximum size for the list.
         """
-        if new_max_size < len(self.items):
-            # If new size is smaller, remove excess items from the left
-            while len(self.items) > new_max_size:
-                self.items.popleft()
+        # If new size is smaller, remove excess items from the left
+        while len(self.items) > new_max_size:
+            self.items.popleft()
         self._max_size = new_max_size
-        self.items = deque(self.items, maxlen=new_max_size)
 
     def add(self, item):
         """
@@ -65,6 +70,8 @@ class LimitedList:
             item: The item to be added to the list.
         """
         self.items.append(item)
+        if len(self.items) > self._max_size:
+            self.items.popleft()
 
     def __getitem__(self, index):
         """
@@ -86,6 +93,15 @@ class LimitedList:
             # Handle integer index
             return self.items[index]
 
+    def __len__(self):
+        """
+        Get the number of items in the list.
+
+        Returns:
+            int: The number of items.
+        """
+        return len(self.items)
+
     def __iter__(self):
         """
         Make the class iterable.